@@ -0,0 +1,6 @@
+"""
+Offline benchmarks: providers run against local stand-in servers, no network or API keys needed.
+
+    python -m benchmarks.providers --providers stabilityai xai --concurrency 1 8 64
+    python -m benchmarks.local_postprocess --sizes 512 1024
+"""
@@ -0,0 +1,84 @@
+"""
+Cold-start cost of importing the package and constructing generators, each in a fresh interpreter.
+
+Exits non-zero if a heavy SDK is imported before the first request, or if importing the package
+takes longer than ``--max-import-ms``, so it can guard startup time in CI.
+
+    python -m benchmarks.import_time --repeat 5 --max-import-ms 300
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# SDKs that must only load with a provider's first generate_image call
+HEAVY_MODULES = ("torch", "diffusers", "google.genai", "openai", "huggingface_hub", "replicate", "httpx")
+
+PROVIDERS = ("google", "stabilityai", "local", "openai", "huggingface", "luma", "xai", "replicate")
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{code}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def scenarios() -> dict[str, str]:
+    cases = {
+        "import package": "import celeste_image_generation",
+        "import factory": "from celeste_image_generation import create_image_generator",
+    }
+    for provider in PROVIDERS:
+        cases[f"construct {provider}"] = (
+            "from celeste_core import Provider\n"
+            "from celeste_image_generation.factory import get_generator_class\n"
+            f"get_generator_class(Provider({provider!r}))()"
+        )
+    return cases
+
+
+def probe(code: str) -> dict[str, object]:
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(code=code, heavy=HEAVY_MODULES)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per scenario")
+    parser.add_argument("--max-import-ms", type=float, default=None, help="fail if the package import is slower")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    failures: list[str] = []
+    for name, code in scenarios().items():
+        try:
+            runs = [probe(code) for _ in range(args.repeat)]
+        except subprocess.CalledProcessError as exc:
+            print(f"{name:<24} skipped: {exc.stderr.strip().splitlines()[-1]}")
+            continue
+        median_ms = statistics.median(float(r["seconds"]) for r in runs) * 1000
+        loaded = sorted({m for r in runs for m in r["loaded"]})
+        print(f"{name:<24} {median_ms:8.1f} ms  heavy modules loaded: {', '.join(loaded) or '-'}")
+        if loaded:
+            failures.append(f"{name} imported {', '.join(loaded)}")
+        if name == "import package" and args.max_import_ms is not None and median_ms > args.max_import_ms:
+            failures.append(f"package import took {median_ms:.1f} ms (limit {args.max_import_ms:.1f} ms)")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""
+CPU microbenchmark of LocalImageGenerator's post-processing path (batching, splitting, encoding).
+
+A tiny dummy pipeline returns pre-rendered images instantly, so the numbers isolate the work the
+generator does around inference rather than diffusion itself.
+
+    python -m benchmarks.local_postprocess --sizes 512 1024 --encodings PNG JPEG RAW
+"""
+
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import Any
+
+from PIL import Image
+
+from celeste_image_generation.diffusion import PipelinePool
+from celeste_image_generation.providers.local import LocalImageGenerator
+
+
+class DummyPipeline:
+    """Stands in for a diffusers pipeline: returns noise images of the requested size."""
+
+    def __init__(self, size: int) -> None:
+        self.image = Image.effect_noise((size, size), 64).convert("RGB")
+
+    def __call__(self, prompt: str | list[str], num_images_per_prompt: int = 1, **_kwargs: Any) -> SimpleNamespace:
+        prompts = prompt if isinstance(prompt, list) else [prompt]
+        return SimpleNamespace(images=[self.image.copy() for _ in range(len(prompts) * num_images_per_prompt)])
+
+
+async def run(size: int, encoding: str, requests: int, concurrency: int) -> tuple[float, float]:
+    """Return (images per second, mean output bytes) for one configuration."""
+    pool = PipelinePool()
+    generator = LocalImageGenerator("benchmark/dummy", pipeline_pool=pool, encoding=encoding)
+    pool.preload(generator.pipeline_key, lambda: DummyPipeline(size), warmup=False)
+    semaphore = asyncio.Semaphore(concurrency)
+    total_bytes = 0
+
+    async def one(i: int) -> None:
+        nonlocal total_bytes
+        async with semaphore:
+            artifacts = await generator.generate_image(f"prompt {i}")
+            total_bytes += sum(len(a.data or b"") for a in artifacts)
+
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        seconds = time.perf_counter() - start
+    finally:
+        await generator.aclose()
+    return requests / seconds, total_bytes / requests
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[512, 1024])
+    parser.add_argument("--encodings", nargs="+", default=["PNG", "JPEG", "WEBP", "RAW", "DECODED"])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8])
+    parser.add_argument("--requests", type=int, default=32)
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    for size in args.sizes:
+        for encoding in args.encodings:
+            for concurrency in args.concurrency:
+                rate, mean_bytes = asyncio.run(run(size, encoding, args.requests, concurrency))
+                print(
+                    f"{size:>5}px {encoding:<8} c={concurrency:<3} {rate:8.1f} img/s  {mean_bytes / 1024:9.1f} KiB/img",
+                    flush=True,
+                )
+
+
+if __name__ == "__main__":
+    main()
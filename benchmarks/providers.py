@@ -0,0 +1,168 @@
+"""
+Throughput, latency, memory and connection usage of HTTP providers against stand-in servers.
+
+    python -m benchmarks.providers --providers stabilityai luma --concurrency 1 8 64 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+
+from celeste_core.base.image_generator import BaseImageGenerator
+
+from celeste_image_generation import ArtifactStore, close_sessions, create_image_generator
+from celeste_image_generation.registry import close_generator
+
+from .servers import StandInConfig, StandInServer
+
+PROVIDERS = ("stabilityai", "xai", "openai", "luma")
+
+
+@dataclass
+class RunResult:
+    provider: str
+    concurrency: int
+    requests: int
+    failures: int
+    seconds: float
+    throughput: float
+    p50: float
+    p99: float
+    connections: int
+    max_in_flight: int
+    peak_rss_mb: float
+    peak_traced_mb: float | None
+
+
+def percentile(samples: list[float], q: int) -> float:
+    if len(samples) < 2:
+        return samples[0] if samples else 0.0
+    return statistics.quantiles(samples, n=100, method="inclusive")[q - 1]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20
+
+
+async def run_level(generator: BaseImageGenerator, requests: int, concurrency: int) -> tuple[list[float], int, float]:
+    """Run ``requests`` calls, ``concurrency`` at a time; return latencies, failures, duration."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    failures = 0
+
+    async def one(i: int) -> None:
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await generator.generate_image(f"benchmark prompt {i}")
+            except Exception:
+                failures += 1
+            else:
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return latencies, failures, time.perf_counter() - start
+
+
+def create_generator(provider: str, server: StandInServer, store: ArtifactStore | None) -> BaseImageGenerator:
+    generator = create_image_generator(
+        provider, base_url=server.base_urls[provider], api_key="benchmark", artifact_store=store
+    )
+    if provider == "luma":
+        # Start polling near the simulated job duration instead of the production default
+        generator.poller.expected_duration = server.config.job_duration
+    return generator
+
+
+async def benchmark(args: argparse.Namespace) -> list[RunResult]:
+    config = StandInConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        payload_size=args.payload_size,
+        error_rate=args.error_rate,
+        job_duration=args.job_duration,
+    )
+    results: list[RunResult] = []
+    store = ArtifactStore(memory_threshold=args.spill_threshold) if args.spill_threshold is not None else None
+    async with StandInServer(config) as server:
+        for provider in args.providers:
+            generator = create_generator(provider, server, store)
+            await run_level(generator, min(4, args.requests), 1)  # warm up connections and lazy imports
+            for concurrency in args.concurrency:
+                server.reset_stats()
+                if args.trace_allocations:
+                    tracemalloc.start()
+                latencies, failures, seconds = await run_level(generator, args.requests, concurrency)
+                traced = None
+                if args.trace_allocations:
+                    traced = tracemalloc.get_traced_memory()[1] / 2**20
+                    tracemalloc.stop()
+                results.append(
+                    RunResult(
+                        provider=provider,
+                        concurrency=concurrency,
+                        requests=args.requests,
+                        failures=failures,
+                        seconds=seconds,
+                        throughput=len(latencies) / seconds,
+                        p50=percentile(latencies, 50),
+                        p99=percentile(latencies, 99),
+                        connections=len(server.stats.connections),
+                        max_in_flight=server.stats.max_in_flight,
+                        peak_rss_mb=peak_rss_mb(),
+                        peak_traced_mb=traced,
+                    )
+                )
+                print(format_result(results[-1]), flush=True)
+            await close_generator(generator)
+        await close_sessions()
+    if store is not None:
+        store.cleanup()
+    return results
+
+
+def format_result(r: RunResult) -> str:
+    traced = f" traced={r.peak_traced_mb:.1f}MB" if r.peak_traced_mb is not None else ""
+    return (
+        f"{r.provider:<12} c={r.concurrency:<4} {r.throughput:8.1f} req/s  p50={r.p50 * 1000:7.1f}ms "
+        f"p99={r.p99 * 1000:7.1f}ms  failures={r.failures:<3} conns={r.connections:<4} "
+        f"in_flight={r.max_in_flight:<4} rss={r.peak_rss_mb:.1f}MB{traced}"
+    )
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--providers", nargs="+", choices=PROVIDERS, default=list(PROVIDERS))
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32, 128])
+    parser.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--payload-size", type=int, default=256 * 1024)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--job-duration", type=float, default=1.0, help="seconds until a Luma job completes")
+    parser.add_argument("--spill-threshold", type=int, default=None, help="spill images above N bytes to disk")
+    parser.add_argument("--trace-allocations", action="store_true", help="report tracemalloc peaks (slower)")
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    results = asyncio.run(benchmark(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([asdict(r) for r in results], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
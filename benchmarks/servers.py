@@ -0,0 +1,157 @@
+"""
+Local aiohttp servers mimicking the HTTP contracts of the Stability, xAI, OpenAI and Luma APIs.
+"""
+
+import asyncio
+import base64
+import itertools
+import os
+import random
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from types import TracebackType
+
+from aiohttp import web
+
+
+@dataclass(frozen=True)
+class StandInConfig:
+    latency: float = 0.05  # seconds before each response
+    jitter: float = 0.0  # extra uniform random latency, in seconds
+    payload_size: int = 256 * 1024  # bytes of "image" data per generation
+    error_rate: float = 0.0  # fraction of requests answered with a 503
+    job_duration: float = 1.0  # seconds until an async (Luma) job completes
+
+
+@dataclass
+class ServerStats:
+    requests: int = 0
+    errors: int = 0
+    max_in_flight: int = 0
+    connections: set[tuple[str, int]] = field(default_factory=set)
+
+
+class StandInServer:
+    """Serves every provider's stand-in endpoints on one local port.
+
+    ``base_urls`` maps provider names to the ``base_url`` to pass to their generators.
+    """
+
+    def __init__(self, config: StandInConfig | None = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.config = config or StandInConfig()
+        self.host = host
+        self.port = port
+        self.stats = ServerStats()
+        self._in_flight = 0
+        self._payload = os.urandom(self.config.payload_size)
+        self._payload_b64 = base64.b64encode(self._payload).decode()
+        self._jobs: dict[str, float] = {}
+        self._ids = itertools.count()
+        self._runner: web.AppRunner | None = None
+
+        self.app = web.Application(middlewares=[self._middleware])
+        self.app.router.add_post("/v2beta/stable-image/generate/{model}", self._stability)
+        self.app.router.add_post("/v1/images/generations", self._images_generations)
+        self.app.router.add_post("/dream-machine/v1/generations/image", self._luma_create)
+        self.app.router.add_get("/dream-machine/v1/generations/{id}", self._luma_status)
+        self.app.router.add_get("/files/{name}", self._file)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def base_urls(self) -> dict[str, str]:
+        return {
+            "stabilityai": f"{self.url}/v2beta",
+            "xai": f"{self.url}/v1",
+            "openai": f"{self.url}/v1",
+            "luma": f"{self.url}/dream-machine/v1",
+        }
+
+    def reset_stats(self) -> None:
+        self.stats = ServerStats()
+
+    async def start(self) -> None:
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> "StandInServer":
+        await self.start()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        await self.stop()
+
+    @web.middleware
+    async def _middleware(
+        self, request: web.Request, handler: Callable[[web.Request], Awaitable[web.StreamResponse]]
+    ) -> web.StreamResponse:
+        stats = self.stats
+        stats.requests += 1
+        peer = request.transport.get_extra_info("peername") if request.transport else None
+        if peer:
+            stats.connections.add(peer[:2])
+        self._in_flight += 1
+        stats.max_in_flight = max(stats.max_in_flight, self._in_flight)
+        try:
+            await asyncio.sleep(self.config.latency + random.uniform(0, self.config.jitter))
+            if random.random() < self.config.error_rate:
+                stats.errors += 1
+                return web.json_response({"error": "overloaded"}, status=503)
+            return await handler(request)
+        finally:
+            self._in_flight -= 1
+
+    async def _stability(self, request: web.Request) -> web.StreamResponse:
+        await request.read()
+        if request.headers.get("Accept", "").startswith("image/"):
+            return web.Response(body=self._payload, content_type="image/png")
+        return web.json_response({"image": self._payload_b64, "finish_reason": "SUCCESS", "seed": 0})
+
+    async def _images_generations(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        count = int(body.get("n", 1))
+        if body.get("response_format") == "url":
+            item = {"url": f"{self.url}/files/image.png"}
+        else:
+            item = {"b64_json": self._payload_b64}
+        data = [{**item, "revised_prompt": body.get("prompt")} for _ in range(count)]
+        return web.json_response({"created": int(time.time()), "data": data})
+
+    async def _luma_create(self, request: web.Request) -> web.StreamResponse:
+        await request.read()
+        job_id = f"job-{next(self._ids)}"
+        self._jobs[job_id] = time.monotonic() + self.config.job_duration
+        return web.json_response({"id": job_id, "state": "queued"}, status=201)
+
+    async def _luma_status(self, request: web.Request) -> web.StreamResponse:
+        job_id = request.match_info["id"]
+        ready_at = self._jobs.get(job_id)
+        if ready_at is None:
+            return web.json_response({"detail": "not found"}, status=404)
+        if time.monotonic() < ready_at:
+            return web.json_response({"id": job_id, "state": "dreaming"})
+        return web.json_response(
+            {"id": job_id, "state": "completed", "assets": {"image": f"{self.url}/files/{job_id}.png"}}
+        )
+
+    async def _file(self, _request: web.Request) -> web.StreamResponse:
+        return web.Response(body=self._payload, content_type="image/png")
+
+
+__all__ = ["ServerStats", "StandInConfig", "StandInServer"]
@@ -40,7 +40,18 @@ async def main() -> None:
             generator = create_image_generator(Provider(provider), model=model)
 
             with st.spinner("Generating..."):
-                result = await generator.generate_image(prompt)
+                if provider == Provider.LOCAL.value:
+                    # Show each denoising step; rerunning the script abandons the generation
+                    progress, preview = st.progress(0.0), st.empty()
+                    async for event in generator.stream_image(prompt, preview_every=2):
+                        if event.total_steps:
+                            progress.progress(event.step / event.total_steps)
+                        if event.preview is not None:
+                            preview.image(event.preview, caption=f"Step {event.step}")
+                        result = event.artifacts
+                    preview.empty()
+                else:
+                    result = await generator.generate_image(prompt)
 
                 if result and result[0].data:
                     img = result[0]
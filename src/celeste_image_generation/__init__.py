@@ -2,48 +2,117 @@
 Celeste Image Generation: A unified image generation interface for multiple providers.
 """
 
-from typing import Any
+import importlib
+from typing import TYPE_CHECKING, Any
 
-from celeste_core import ImageArtifact, Provider
-from celeste_core.base.image_generator import BaseImageGenerator
-from celeste_core.config.settings import settings
+if TYPE_CHECKING:
+    from celeste_core import ImageArtifact, Provider
+    from celeste_core.base.image_generator import BaseImageGenerator
 
-from .mapping import PROVIDER_MAPPING
-
-__version__ = "0.1.0"
+    from .bulk import BulkResult, generate_many
+    from .cache import CachedImageGenerator, ResultCache
+    from .factory import create_image_generator
+    from .hedging import HedgedImageGenerator, create_hedged_generator
+    from .instrumentation import OpenTelemetryExporter, PrometheusExporter, add_exporter, enable_instrumentation
+    from .jobs import Job, JobQueue, JobState, WorkerPool
+    from .params import InvalidRequestError, validate_request
+    from .ratelimit import RateLimit, RateLimiter, get_rate_limiter, set_rate_limit
+    from .registry import GeneratorRegistry, RegistryStats
+    from .resilience import CircuitOpenError, RetryPolicy
+    from .sessions import SessionPool, close_sessions, get_session_pool
+    from .singleflight import SingleFlightImageGenerator
+    from .storage import ArtifactStore, SpilledPayload
 
+# Public names and the modules defining them. They are imported on first access (PEP 562), so
+# ``import celeste_image_generation`` stays cheap for workers and CLIs that use only a part of it.
+_EXPORTS: dict[str, str] = {
+    "ImageArtifact": "celeste_core",
+    "Provider": "celeste_core",
+    "BaseImageGenerator": "celeste_core.base.image_generator",
+    "BulkResult": ".bulk",
+    "generate_many": ".bulk",
+    "CachedImageGenerator": ".cache",
+    "ResultCache": ".cache",
+    "create_image_generator": ".factory",
+    "HedgedImageGenerator": ".hedging",
+    "create_hedged_generator": ".hedging",
+    "OpenTelemetryExporter": ".instrumentation",
+    "PrometheusExporter": ".instrumentation",
+    "add_exporter": ".instrumentation",
+    "enable_instrumentation": ".instrumentation",
+    "Job": ".jobs",
+    "JobQueue": ".jobs",
+    "JobState": ".jobs",
+    "WorkerPool": ".jobs",
+    "InvalidRequestError": ".params",
+    "validate_request": ".params",
+    "RateLimit": ".ratelimit",
+    "RateLimiter": ".ratelimit",
+    "get_rate_limiter": ".ratelimit",
+    "set_rate_limit": ".ratelimit",
+    "GeneratorRegistry": ".registry",
+    "RegistryStats": ".registry",
+    "CircuitOpenError": ".resilience",
+    "RetryPolicy": ".resilience",
+    "SessionPool": ".sessions",
+    "close_sessions": ".sessions",
+    "get_session_pool": ".sessions",
+    "SingleFlightImageGenerator": ".singleflight",
+    "ArtifactStore": ".storage",
+    "SpilledPayload": ".storage",
+}
 
-def create_image_generator(provider: str | Provider, **kwargs: Any) -> "BaseImageGenerator":
-    """
-    Factory function to create an image generator instance based on the provider.
 
-    Args:
-        provider: The image generator provider to use (string or Provider enum).
-        **kwargs: Additional arguments to pass to the image generator constructor.
+def __getattr__(name: str) -> Any:
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
 
-    Returns:
-        An instance of an image generator
-    """
-    # Normalize to enum
-    provider_enum: Provider = provider if isinstance(provider, Provider) else Provider(provider)
 
-    if provider_enum not in PROVIDER_MAPPING:
-        raise ValueError(f"Unsupported provider: {provider_enum}")
+def __dir__() -> list[str]:
+    return sorted({*globals(), *_EXPORTS})
 
-    # Validate environment for the chosen provider
-    settings.validate_for_provider(provider_enum.value)
 
-    module_path, class_name = PROVIDER_MAPPING[provider_enum]
-    module = __import__(f"celeste_image_generation.{module_path}", fromlist=[class_name])
-    generator_class = getattr(module, class_name)
-
-    return generator_class(**kwargs)
+__version__ = "0.1.0"
 
 
 __all__ = [
     "create_image_generator",
+    "create_hedged_generator",
+    "add_exporter",
+    "enable_instrumentation",
+    "generate_many",
+    "get_rate_limiter",
+    "set_rate_limit",
+    "validate_request",
+    "ArtifactStore",
     "BaseImageGenerator",
+    "BulkResult",
+    "CachedImageGenerator",
+    "CircuitOpenError",
+    "GeneratorRegistry",
+    "HedgedImageGenerator",
+    "InvalidRequestError",
+    "Job",
+    "JobQueue",
+    "JobState",
+    "OpenTelemetryExporter",
+    "PrometheusExporter",
     "Provider",
     "ImageArtifact",
+    "RateLimit",
+    "RateLimiter",
+    "RegistryStats",
+    "ResultCache",
+    "RetryPolicy",
+    "SessionPool",
+    "SingleFlightImageGenerator",
+    "SpilledPayload",
+    "WorkerPool",
+    "close_sessions",
+    "get_session_pool",
     "__version__",
 ]
@@ -0,0 +1,89 @@
+"""
+Bulk generation over many prompts under per-provider rate limits.
+"""
+
+import asyncio
+from collections.abc import AsyncIterator, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from celeste_core import ImageArtifact
+from celeste_core.base.image_generator import BaseImageGenerator
+
+from .ratelimit import RateLimiter, get_rate_limiter
+
+
+@dataclass
+class BulkResult:
+    index: int
+    prompt: str
+    artifacts: list[ImageArtifact] | None = None
+    error: Exception | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+async def _generate_one(
+    generator: BaseImageGenerator,
+    limiter: RateLimiter,
+    index: int,
+    prompt: str,
+    kwargs: dict[str, Any],
+) -> BulkResult:
+    try:
+        async with limiter:
+            artifacts = await generator.generate_image(prompt, **kwargs)
+    except Exception as exc:
+        return BulkResult(index=index, prompt=prompt, error=exc)
+    return BulkResult(index=index, prompt=prompt, artifacts=artifacts)
+
+
+async def generate_many(
+    generator: BaseImageGenerator,
+    prompts: Iterable[str],
+    limiter: RateLimiter | None = None,
+    max_pending: int | None = None,
+    **kwargs: Any,
+) -> AsyncIterator[BulkResult]:
+    """
+    Generate images for many prompts, yielding results in completion order.
+
+    Args:
+        generator: Any generator returned by create_image_generator.
+        prompts: Prompts to generate; consumed lazily, so it may be a large generator.
+        limiter: Rate limiter to respect; defaults to the process-wide one for the provider.
+        max_pending: Upper bound on scheduled-but-unfinished prompts, which bounds memory.
+        **kwargs: Generation kwargs shared by every prompt.
+
+    Yields:
+        One BulkResult per prompt. Failures are captured in ``error`` instead of raised.
+    """
+    limiter = limiter or get_rate_limiter(generator.provider)
+    max_pending = max_pending or 2 * (limiter.max_concurrency or 32)
+    prompt_iter = iter(enumerate(prompts))
+    pending: set[asyncio.Task[BulkResult]] = set()
+
+    def fill() -> None:
+        for index, prompt in prompt_iter:
+            pending.add(asyncio.create_task(_generate_one(generator, limiter, index, prompt, kwargs)))
+            if len(pending) >= max_pending:
+                return
+
+    try:
+        fill()
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            pending.difference_update(done)
+            fill()
+            for task in done:
+                yield task.result()
+    finally:
+        # The consumer stopped early or was cancelled: don't leave orphaned requests running
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+__all__ = ["BulkResult", "generate_many"]
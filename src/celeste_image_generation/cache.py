@@ -0,0 +1,209 @@
+"""
+Content-addressed, disk-backed cache of generation results.
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from celeste_core import ImageArtifact
+from celeste_core.base.image_generator import BaseImageGenerator
+
+from .instrumentation import increment, stage
+from .params import request_key
+from .storage import spilled_payload
+from .wrapper import ImageGeneratorWrapper
+
+# Request kwargs that pin down the output of an otherwise random generation
+SEED_KWARGS = frozenset({"seed", "generator"})
+
+
+def is_seeded(kwargs: dict[str, Any]) -> bool:
+    return any(kwargs.get(name) is not None for name in SEED_KWARGS)
+
+
+class ResultCache:
+    """On-disk store of ImageArtifact bytes and metadata keyed by request hash.
+
+    Each entry is a directory holding ``meta.json`` and one ``<n>.bin`` per image. Entries
+    older than ``ttl`` seconds are treated as misses, and least-recently-read entries are
+    removed once the store grows past ``max_bytes``. Every method that touches the disk
+    (including the index scan on first use) runs in a worker thread.
+    """
+
+    def __init__(self, directory: str | Path, max_bytes: int = 2 * 1024**3, ttl: float | None = None) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> (size in bytes, last access time), rebuilt from disk on first use
+        self._index: dict[str, tuple[int, float]] | None = None
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.directory / key[:2] / key
+
+    def _load_index(self) -> dict[str, tuple[int, float]]:
+        with self._lock:
+            if self._index is not None:
+                return self._index
+        self.directory.mkdir(parents=True, exist_ok=True)
+        index = {}
+        for meta in self.directory.glob("*/*/meta.json"):
+            entry = meta.parent
+            if entry.name.startswith("."):  # staging directory left by an interrupted put
+                continue
+            size = sum(f.stat().st_size for f in entry.glob("*.bin"))
+            index[entry.name] = (size, meta.stat().st_mtime)
+        with self._lock:
+            if self._index is None:
+                self._index = index
+            return self._index
+
+    async def get(self, key: str) -> list[ImageArtifact] | None:
+        """Return the cached artifacts for ``key``, or None on a miss or expired entry."""
+        return await asyncio.to_thread(self._read, key)
+
+    async def put(self, key: str, artifacts: list[ImageArtifact]) -> None:
+        """Store artifacts under ``key``, replacing any previous entry atomically."""
+        await asyncio.to_thread(self._write, key, artifacts)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._remove, key)
+
+    async def clear(self) -> None:
+        await asyncio.to_thread(self._clear)
+
+    @property
+    def size_bytes(self) -> int:
+        with self._lock:
+            return sum(size for size, _ in (self._index or {}).values())
+
+    def _read(self, key: str) -> list[ImageArtifact] | None:
+        index = self._load_index()
+        entry = self._entry_dir(key)
+        try:
+            meta = json.loads((entry / "meta.json").read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._record(hit=False)
+            return None
+
+        if self.ttl is not None and time.time() - meta["created_at"] > self.ttl:
+            self._remove(key)
+            self._record(hit=False)
+            return None
+
+        try:
+            artifacts = [
+                ImageArtifact(data=(entry / f"{i}.bin").read_bytes(), metadata=metadata)
+                for i, metadata in enumerate(meta["artifacts"])
+            ]
+        except FileNotFoundError:  # evicted concurrently
+            self._record(hit=False)
+            return None
+
+        now = time.time()
+        os.utime(entry / "meta.json", (now, now))
+        with self._lock:
+            if key in index:
+                index[key] = (index[key][0], now)
+        self._record(hit=True)
+        return artifacts
+
+    def _write(self, key: str, artifacts: list[ImageArtifact]) -> None:
+        index = self._load_index()
+        entry = self._entry_dir(key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(dir=entry.parent, prefix=".tmp-"))
+        size = 0
+        metadata: list[dict[str, Any]] = []
+        for i, artifact in enumerate(artifacts):
+            payload = spilled_payload(artifact.metadata)
+            if payload is not None:
+                shutil.copyfile(payload.path, staging / f"{i}.bin")
+                size += payload.size
+                # Served from the cache as in-memory bytes, so drop the spill file references
+                metadata.append({k: v for k, v in artifact.metadata.items() if k not in ("payload", "path")})
+                continue
+            data = artifact.data or b""
+            (staging / f"{i}.bin").write_bytes(data)
+            size += len(data)
+            metadata.append(artifact.metadata or {})
+        meta = {"created_at": time.time(), "artifacts": metadata}
+        (staging / "meta.json").write_text(json.dumps(meta, default=repr))
+
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(staging, entry)
+        with self._lock:
+            index[key] = (size, time.time())
+        self._evict(index)
+
+    def _remove(self, key: str) -> None:
+        with self._lock:
+            if self._index is not None:
+                self._index.pop(key, None)
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+    def _clear(self) -> None:
+        for key in list(self._load_index()):
+            self._remove(key)
+
+    def _record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _evict(self, index: dict[str, tuple[int, float]]) -> None:
+        with self._lock:
+            total = sum(size for size, _ in index.values())
+            victims = []
+            for key, (size, _) in sorted(index.items(), key=lambda item: item[1][1]):
+                if total <= self.max_bytes:
+                    break
+                victims.append(key)
+                total -= size
+        for key in victims:
+            self._remove(key)
+
+
+class CachedImageGenerator(ImageGeneratorWrapper):
+    """Serves repeated requests from a ResultCache without calling the wrapped generator.
+
+    Requests without a seed are non-deterministic and bypass the cache unless
+    ``cache_unseeded`` is set.
+    """
+
+    def __init__(self, generator: BaseImageGenerator, cache: ResultCache, cache_unseeded: bool = False) -> None:
+        super().__init__(generator)
+        self.cache = cache
+        self.cache_unseeded = cache_unseeded
+
+    async def generate_image(self, prompt: str, **kwargs: Any) -> list[ImageArtifact]:
+        if not (self.cache_unseeded or is_seeded(kwargs)):
+            uncached: list[ImageArtifact] = await self.generator.generate_image(prompt, **kwargs)
+            return uncached
+
+        key = request_key(self.provider, self.model, prompt, kwargs)
+        with stage("cache_lookup"):
+            cached = await self.cache.get(key)
+        if cached is not None:
+            increment("cache_hits")
+            return cached
+
+        artifacts: list[ImageArtifact] = await self.generator.generate_image(prompt, **kwargs)
+        # Artifacts without bytes (e.g. DECODED encoding) can't be stored
+        if all(a.data is not None or spilled_payload(a.metadata) is not None for a in artifacts):
+            await self.cache.put(key, artifacts)
+        return artifacts
+
+
+__all__ = ["CachedImageGenerator", "ResultCache", "is_seeded", "request_key"]
@@ -0,0 +1,23 @@
+"""
+Building blocks for running diffusers pipelines in-process.
+"""
+
+from .cpu import CPU_PROFILES, CpuProfile, ProfileReport
+from .embeddings import PromptEmbeddingCache, get_embedding_cache
+from .engine import InferenceEngine
+from .pool import PipelinePool, get_pipeline_pool
+from .progress import GenerationCancelledError, GenerationProgress, StepTracker
+
+__all__ = [
+    "CPU_PROFILES",
+    "CpuProfile",
+    "GenerationCancelledError",
+    "GenerationProgress",
+    "InferenceEngine",
+    "PipelinePool",
+    "ProfileReport",
+    "PromptEmbeddingCache",
+    "StepTracker",
+    "get_embedding_cache",
+    "get_pipeline_pool",
+]
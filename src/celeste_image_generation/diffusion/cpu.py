@@ -0,0 +1,211 @@
+"""
+CPU performance profiles for diffusers pipelines: threading, memory format, VAE chunking,
+torch.compile and bfloat16.
+"""
+
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from ..lazy import lazy_import
+
+torch = lazy_import("torch")
+
+logger = logging.getLogger(__name__)
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on, honouring affinity masks and container cpusets."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def bfloat16_supported() -> bool:
+    """Whether the CPU has native bfloat16 kernels (AVX512-BF16 / AMX); emulated bf16 is slower."""
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())  # noqa: SLF001 - no public API
+    except (AttributeError, RuntimeError):
+        return False
+
+
+@dataclass(frozen=True)
+class CpuProfile:
+    """How a LocalImageGenerator tunes a pipeline that runs on the CPU.
+
+    ``intra_op_threads`` defaults to the available CPUs divided by ``workers``, so several
+    inference workers on one node don't oversubscribe it. ``vae_tiling`` only changes
+    decoding above the VAE's tile size (512px for SD), so it is safe to leave on for small
+    images. ``compile`` wraps the denoiser in torch.compile, caching compiled graphs in
+    ``compile_cache_dir`` across restarts; ``preload()`` then warms up at
+    ``compile_warmup_size`` so the first real request doesn't pay for compilation.
+    ``bfloat16`` is used only where the CPU supports it natively.
+    """
+
+    name: str = "custom"
+    workers: int = 1
+    intra_op_threads: int | None = None
+    inter_op_threads: int | None = None
+    channels_last: bool = True
+    vae_slicing: bool = True
+    vae_tiling: bool = True
+    compile: bool = False
+    compile_mode: str | None = None
+    compile_cache_dir: str | None = None
+    compile_warmup_size: int = 512
+    bfloat16: bool = False
+
+    @classmethod
+    def parse(cls, value: "CpuProfile | str") -> "CpuProfile":
+        if isinstance(value, CpuProfile):
+            return value
+        try:
+            return CPU_PROFILES[value]
+        except KeyError:
+            raise ValueError(f"Unknown CPU profile {value!r}; expected one of {sorted(CPU_PROFILES)}") from None
+
+    @property
+    def threads(self) -> int:
+        return self.intra_op_threads or max(1, available_cpus() // self.workers)
+
+    @property
+    def warmup_kwargs(self) -> dict[str, Any]:
+        size = self.compile_warmup_size
+        return {"num_inference_steps": 1, "height": size, "width": size}
+
+
+CPU_PROFILES = {
+    "balanced": CpuProfile("balanced"),
+    "fast": CpuProfile("fast", compile=True, bfloat16=True),
+}
+
+
+# Thread pools and the inductor cache belong to the whole process: setting -> value applied
+_process_settings: dict[str, Any] = {}
+_process_lock = threading.Lock()
+
+
+def configure_process(profile: CpuProfile) -> None:
+    """Apply the profile's process-wide settings: thread counts and the compile cache directory.
+
+    Every pipeline in the process shares these, so the first profile to set each one wins and a
+    later profile asking for a different value logs a warning and runs with the first. Serve
+    profiles with different thread counts from separate processes (e.g. WorkerPool workers).
+    Call on the thread that runs inference.
+    """
+    settings: dict[str, Any] = {"intra_op_threads": profile.threads}
+    if profile.inter_op_threads is not None:
+        settings["inter_op_threads"] = profile.inter_op_threads
+    if profile.compile and profile.compile_cache_dir is not None:
+        settings["compile_cache_dir"] = profile.compile_cache_dir
+
+    with _process_lock:
+        for name, value in settings.items():
+            if name not in _process_settings:
+                _apply_process_setting(name, value)
+                _process_settings[name] = value
+            elif _process_settings[name] != value:
+                current = _process_settings[name]
+                logger.warning(
+                    "CPU profile %r asks for %s=%r, but this process already uses %r",
+                    profile.name,
+                    name,
+                    value,
+                    current,
+                )
+
+
+def _apply_process_setting(name: str, value: Any) -> None:
+    if name == "intra_op_threads":
+        torch.set_num_threads(value)
+    elif name == "inter_op_threads":
+        try:
+            torch.set_num_interop_threads(value)
+        except RuntimeError:
+            # Only settable before any inter-op parallel work has started
+            logger.debug("Inter-op thread count already fixed at %d", torch.get_num_interop_threads())
+    elif name == "compile_cache_dir":
+        os.environ["TORCHINDUCTOR_CACHE_DIR"] = value
+        os.environ.setdefault("TORCHINDUCTOR_FX_GRAPH_CACHE", "1")
+
+
+def apply_cpu_profile(pipeline: Any, profile: CpuProfile) -> Any:
+    """Tune a freshly loaded CPU pipeline in place and return it."""
+    if profile.channels_last:
+        for name in ("unet", "vae"):
+            module = getattr(pipeline, name, None)
+            if isinstance(module, torch.nn.Module):
+                module.to(memory_format=torch.channels_last)
+
+    vae = getattr(pipeline, "vae", None)
+    if vae is not None:
+        if profile.vae_slicing and hasattr(vae, "enable_slicing"):
+            vae.enable_slicing()
+        if profile.vae_tiling and hasattr(vae, "enable_tiling"):
+            vae.enable_tiling()
+
+    # The compile cache directory is process-wide and set by configure_process()
+    if profile.compile:
+        # UNet pipelines (SD, SDXL) or transformer ones (SD3, Flux)
+        name = "unet" if getattr(pipeline, "unet", None) is not None else "transformer"
+        denoiser = getattr(pipeline, name, None)
+        if denoiser is not None:
+            setattr(pipeline, name, torch.compile(denoiser, mode=profile.compile_mode))
+    return pipeline
+
+
+def reset_peak_memory() -> bool:
+    """Restart the process's peak resident memory from its current size (Linux only)."""
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+    except OSError:
+        return False
+    return True
+
+
+def peak_memory() -> int | None:
+    """Peak resident memory of the process in bytes since start or ``reset_peak_memory()``."""
+    try:
+        status = Path("/proc/self/status").read_text()
+    except OSError:
+        return None
+    for line in status.splitlines():
+        if line.startswith("VmHWM:"):
+            return int(line.split()[1]) * 1024
+    return None
+
+
+@dataclass(frozen=True)
+class ProfileReport:
+    """Measured effect of a CPU profile against an untuned float32 pipeline, per generation.
+
+    Each side is measured in its own fresh process, so ``peak_memory`` and
+    ``baseline_peak_memory`` are that process's peak resident size while timed: the pipeline
+    plus the Python and torch runtime, not the pipeline alone (None off Linux).
+    """
+
+    profile: str
+    seconds: float
+    baseline_seconds: float
+    peak_memory: int | None
+    baseline_peak_memory: int | None
+
+    @property
+    def speedup(self) -> float:
+        return self.baseline_seconds / self.seconds
+
+
+__all__ = [
+    "CPU_PROFILES",
+    "CpuProfile",
+    "ProfileReport",
+    "apply_cpu_profile",
+    "available_cpus",
+    "bfloat16_supported",
+    "configure_process",
+    "peak_memory",
+    "reset_peak_memory",
+]
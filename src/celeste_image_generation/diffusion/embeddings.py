@@ -0,0 +1,160 @@
+"""
+LRU cache of text-encoder outputs, so repeated prompts skip the encode step.
+"""
+
+import inspect
+import threading
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any
+
+from ..lazy import lazy_import
+
+torch = lazy_import("torch")
+
+# encode_prompt outputs in order: SD-style pipelines return the first two, SDXL-style all four
+EMBEDDING_KWARGS = ("prompt_embeds", "negative_prompt_embeds", "pooled_prompt_embeds", "negative_pooled_prompt_embeds")
+
+# Prompt text besides the main prompt that goes into the text encoders
+PROMPT_TEXT_KWARGS = ("prompt_2", "negative_prompt", "negative_prompt_2")
+
+# Requests with these change or replace what the encoders produce and are never cached
+BYPASS_KWARGS = frozenset({*EMBEDDING_KWARGS, "clip_skip", "cross_attention_kwargs"})
+
+Embeddings = dict[str, Any]
+
+
+def embeddings_size(embeddings: Embeddings) -> int:
+    return sum(t.numel() * t.element_size() for t in embeddings.values())
+
+
+class PromptEmbeddingCache:
+    """Thread-safe LRU of prompt embeddings, bounded by ``max_bytes`` of tensor data.
+
+    ``max_bytes=0`` disables caching.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024**2) -> None:
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[Embeddings, int]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def memory_usage(self) -> int:
+        return self._size
+
+    def get(self, key: Hashable) -> Embeddings | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, embeddings: Embeddings) -> None:
+        size = embeddings_size(embeddings)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+            self._entries[key] = (embeddings, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+def _parameters(fn: Any) -> dict[str, inspect.Parameter]:
+    try:
+        return dict(inspect.signature(fn).parameters)
+    except (TypeError, ValueError):
+        return {}
+
+
+def _guidance_enabled(pipeline: Any, kwargs: dict[str, Any]) -> bool:
+    """Whether the pipeline will run classifier-free guidance and so needs negative embeddings."""
+    param = _parameters(pipeline.__call__).get("guidance_scale")
+    scale = kwargs.get("guidance_scale", param.default if param is not None else None)
+    return isinstance(scale, int | float) and scale > 1.0
+
+
+def _encode(pipeline: Any, prompt: str, options: dict[str, Any], guidance: bool) -> Embeddings:
+    outputs = pipeline.encode_prompt(
+        prompt=prompt,
+        device=getattr(pipeline, "_execution_device", None) or pipeline.device,
+        num_images_per_prompt=1,
+        do_classifier_free_guidance=guidance,
+        **options,
+    )
+    return {name: value for name, value in zip(EMBEDDING_KWARGS, outputs, strict=False) if value is not None}
+
+
+def cached_prompt_embeddings(
+    pipeline: Any,
+    prompts: list[str],
+    kwargs: dict[str, Any],
+    cache: PromptEmbeddingCache,
+    namespace: Hashable,
+) -> dict[str, Any] | None:
+    """Pipeline kwargs with the prompts replaced by (cached) embeddings, concatenated per batch.
+
+    Returns None when the pipeline or request can't use precomputed embeddings, in which case
+    the pipeline encodes the prompts itself. Must run on the thread that owns the pipeline.
+    """
+    if cache.max_bytes <= 0 or BYPASS_KWARGS.intersection(kwargs) or not hasattr(pipeline, "encode_prompt"):
+        return None
+    encode_params = _parameters(pipeline.encode_prompt)
+    if "do_classifier_free_guidance" not in encode_params or "prompt_embeds" not in _parameters(pipeline.__call__):
+        return None
+    options = {name: kwargs[name] for name in PROMPT_TEXT_KWARGS if kwargs.get(name) is not None}
+    if any(name not in encode_params or not isinstance(value, str) for name, value in options.items()):
+        return None
+
+    guidance = _guidance_enabled(pipeline, kwargs)
+    per_prompt: list[Embeddings] = []
+    for prompt in prompts:
+        key = (namespace, prompt, tuple(sorted(options.items())), guidance)
+        embeddings = cache.get(key)
+        if embeddings is None:
+            embeddings = _encode(pipeline, prompt, options, guidance)
+            cache.put(key, embeddings)
+        per_prompt.append(embeddings)
+
+    call_kwargs = {name: value for name, value in kwargs.items() if name not in PROMPT_TEXT_KWARGS}
+    for name in per_prompt[0]:
+        tensors = [embeddings[name] for embeddings in per_prompt]
+        call_kwargs[name] = tensors[0] if len(tensors) == 1 else torch.cat(tensors)
+    return call_kwargs
+
+
+_default_cache = PromptEmbeddingCache()
+
+
+def get_embedding_cache() -> PromptEmbeddingCache:
+    """Return the cache used by LocalImageGenerator instances that were not given their own."""
+    return _default_cache
+
+
+__all__ = [
+    "BYPASS_KWARGS",
+    "EMBEDDING_KWARGS",
+    "PromptEmbeddingCache",
+    "cached_prompt_embeddings",
+    "embeddings_size",
+    "get_embedding_cache",
+]
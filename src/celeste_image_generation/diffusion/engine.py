@@ -0,0 +1,187 @@
+import asyncio
+import contextlib
+import threading
+import time
+from collections.abc import Callable, Hashable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, TypeVar
+
+from ..instrumentation import record_stage
+from ..lazy import lazy_import
+from ..registry import freeze_kwargs
+
+torch = lazy_import("torch")
+
+T = TypeVar("T")
+
+# Arguments that are tied to a single request and cannot be shared by a batched call
+PER_REQUEST_KWARGS = frozenset(
+    {
+        "generator",
+        "latents",
+        "prompt_embeds",
+        "negative_prompt_embeds",
+        "pooled_prompt_embeds",
+        "negative_pooled_prompt_embeds",
+        "callback_on_step_end",
+        "ip_adapter_image",
+    }
+)
+
+# Prompt-like arguments that diffusers expects as one entry per prompt in a batched call
+PER_PROMPT_KWARGS = ("prompt_2", "negative_prompt", "negative_prompt_2")
+
+
+# Per-prompt images plus the (stage, seconds) timings of the pipeline call that produced them
+_Result = tuple[list[Any], dict[str, float]]
+
+# (pipeline, prompts, kwargs) -> kwargs replacing the prompts (e.g. with embeddings), or None
+PrepareInputs = Callable[[Any, list[str], dict[str, Any]], dict[str, Any] | None]
+
+
+@dataclass
+class _Batch:
+    kwargs: dict[str, Any]
+    prompts: list[str] = field(default_factory=list)
+    futures: list[asyncio.Future[_Result]] = field(default_factory=list)
+    timer: asyncio.TimerHandle | None = None
+
+
+def _batch_key(kwargs: dict[str, Any]) -> Hashable | None:
+    """Requests with equal keys can share one pipeline call; None means run alone."""
+    if PER_REQUEST_KWARGS.intersection(kwargs):
+        return None
+    return freeze_kwargs(kwargs)
+
+
+class InferenceEngine:
+    """Runs a diffusers pipeline on a dedicated worker thread with dynamic micro-batching.
+
+    Concurrent calls with identical kwargs (steps, size, guidance, ...) that arrive within
+    ``max_wait`` seconds are merged into one pipeline call over a list of prompts, up to
+    ``max_batch_size`` prompts, and the images are fanned back out to each caller. The event
+    loop never runs pipeline code, so other coroutines keep running during inference.
+
+    ``prepare_inputs`` runs on the worker thread before each pipeline call and may swap the
+    prompts for precomputed inputs such as cached prompt embeddings. When the pipeline is
+    shared with other engines, ``pipeline_lock`` returns the lock held around each call.
+    """
+
+    def __init__(
+        self,
+        load_pipeline: Callable[[], Any],
+        max_batch_size: int = 4,
+        max_wait: float = 0.05,
+        *,
+        prepare_inputs: PrepareInputs | None = None,
+        pipeline_lock: Callable[[], threading.Lock] | None = None,
+    ) -> None:
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.load_pipeline = load_pipeline
+        self.prepare_inputs = prepare_inputs
+        self.pipeline_lock = pipeline_lock
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="celeste-diffusion")
+        self._pending: dict[Hashable, _Batch] = {}
+        self._dispatching: set[asyncio.Task[None]] = set()
+
+    async def run(self, prompt: str, **kwargs: Any) -> list[Any]:
+        """Generate the images for one prompt, possibly as part of a larger batch."""
+        key = _batch_key(kwargs)
+        if key is None or self.max_batch_size == 1:
+            images_per_prompt, timings = await self._execute([prompt], kwargs)
+            images = images_per_prompt[0]
+        else:
+            images, timings = await self._enqueue(key, prompt, kwargs)
+
+        for name, seconds in timings.items():
+            record_stage(name, seconds)
+        return images
+
+    async def _enqueue(self, key: Hashable, prompt: str, kwargs: dict[str, Any]) -> _Result:
+        loop = asyncio.get_running_loop()
+        queued = time.perf_counter()
+        future: asyncio.Future[_Result] = loop.create_future()
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = _Batch(kwargs)
+            batch.timer = loop.call_later(self.max_wait, self._flush, key)
+        batch.prompts.append(prompt)
+        batch.futures.append(future)
+        if len(batch.prompts) >= self.max_batch_size:
+            self._flush(key)
+        images, timings = await future
+        return images, {"batch_wait": time.perf_counter() - queued - sum(timings.values()), **timings}
+
+    def _flush(self, key: Hashable) -> None:
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        task = asyncio.get_running_loop().create_task(self._dispatch(batch))
+        self._dispatching.add(task)
+        task.add_done_callback(self._dispatching.discard)
+
+    async def _dispatch(self, batch: _Batch) -> None:
+        # Callers that were cancelled while waiting for the batch window are dropped
+        live = [(p, f) for p, f in zip(batch.prompts, batch.futures, strict=True) if not f.done()]
+        if not live:
+            return
+        try:
+            results, timings = await self._execute([p for p, _ in live], batch.kwargs)
+        except Exception as exc:
+            for _, future in live:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, future), images in zip(live, results, strict=True):
+            if not future.done():
+                future.set_result((images, timings))
+
+    async def call(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run ``fn`` on the engine's worker thread, serialized with inference calls."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def _execute(self, prompts: list[str], kwargs: dict[str, Any]) -> tuple[list[list[Any]], dict[str, float]]:
+        return await self.call(self._infer, prompts, kwargs)
+
+    def _infer(self, prompts: list[str], kwargs: dict[str, Any]) -> tuple[list[list[Any]], dict[str, float]]:
+        """Worker-thread body: one pipeline call, split back into per-prompt image lists."""
+        start = time.perf_counter()
+        pipeline = self.load_pipeline()
+        loaded = time.perf_counter()
+        lock = self.pipeline_lock() if self.pipeline_lock is not None else contextlib.nullcontext()
+        with lock, torch.inference_mode():
+            prepared = self.prepare_inputs(pipeline, prompts, kwargs) if self.prepare_inputs is not None else None
+            encoded = time.perf_counter()
+            if prepared is not None:
+                images = pipeline(None, **prepared).images
+            else:
+                call_kwargs = dict(kwargs)
+                for name in PER_PROMPT_KWARGS:
+                    if isinstance(call_kwargs.get(name), str):
+                        call_kwargs[name] = [call_kwargs[name]] * len(prompts)
+                images = pipeline(prompts, **call_kwargs).images
+
+        timings = {"pipeline_load": loaded - start, "inference": time.perf_counter() - encoded}
+        if prepared is not None:
+            timings["text_encode"] = encoded - loaded
+        per_prompt = len(images) // len(prompts)
+        return [images[i * per_prompt : (i + 1) * per_prompt] for i in range(len(prompts))], timings
+
+    async def aclose(self) -> None:
+        """Fail requests still waiting for a batch and stop the worker thread."""
+        for batch in self._pending.values():
+            if batch.timer is not None:
+                batch.timer.cancel()
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(RuntimeError("Inference engine closed"))
+        self._pending.clear()
+        await asyncio.gather(*self._dispatching, return_exceptions=True)
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,143 @@
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+from typing import Any
+
+from ..lazy import lazy_import
+
+torch = lazy_import("torch")
+
+# Dummy request used to trigger weight loading and lazy kernel initialization
+WARMUP_KWARGS: dict[str, Any] = {"num_inference_steps": 1, "height": 64, "width": 64}
+
+
+@dataclass
+class _Entry:
+    pipeline: Any
+    size_bytes: int
+
+
+def pipeline_size(pipeline: Any) -> int:
+    """Approximate resident size of a pipeline from its modules' parameters and buffers."""
+    total = 0
+    for component in getattr(pipeline, "components", {}).values():
+        if isinstance(component, torch.nn.Module):
+            tensors = [*component.parameters(), *component.buffers()]
+            total += sum(t.numel() * t.element_size() for t in tensors)
+    return total
+
+
+class PipelinePool:
+    """Process-wide pool of loaded diffusers pipelines shared across generator instances.
+
+    Pipelines are keyed by the caller (typically model, dtype and device) and loaded at most
+    once per key. When ``memory_budget`` (bytes) is set, least-recently-used pipelines are
+    dropped until the pool fits; a pipeline still referenced by an in-flight call is freed
+    once that call finishes.
+
+    Diffusers pipelines keep per-call state (scheduler timesteps, attention processors), so
+    every call on a pooled pipeline must hold its ``lock(key)``; generators sharing a pipeline
+    then take turns rather than corrupting each other's output.
+    """
+
+    def __init__(self, memory_budget: int | None = None) -> None:
+        self.memory_budget = memory_budget
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading: dict[Hashable, threading.Lock] = {}
+        self._call_locks: dict[Hashable, threading.Lock] = {}
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Return the pipeline for ``key``, calling ``loader`` if it is not loaded yet."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry.pipeline
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        # Loading happens outside the pool lock so different models can load concurrently
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None:
+                return entry.pipeline
+            pipeline = loader()
+            with self._lock:
+                self._entries[key] = _Entry(pipeline, pipeline_size(pipeline))
+                self._loading.pop(key, None)
+                self._enforce_budget()
+            return pipeline
+
+    def lock(self, key: Hashable) -> threading.Lock:
+        """The lock serializing calls on the pipeline for ``key``; kept across evictions."""
+        with self._lock:
+            return self._call_locks.setdefault(key, threading.Lock())
+
+    def preload(
+        self,
+        key: Hashable,
+        loader: Callable[[], Any],
+        warmup: bool = True,
+        warmup_kwargs: dict[str, Any] | None = None,
+    ) -> Any:
+        """Load a pipeline ahead of traffic and optionally run one tiny dummy inference."""
+        pipeline = self.get(key, loader)
+        if warmup:
+            with self.lock(key), torch.inference_mode():
+                pipeline("warmup", **(warmup_kwargs or WARMUP_KWARGS))
+        return pipeline
+
+    def peek(self, key: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+        return None if entry is None else entry.pipeline
+
+    def evict(self, key: Hashable) -> bool:
+        with self._lock:
+            removed = self._entries.pop(key, None) is not None
+        if removed:
+            _release_device_memory()
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        _release_device_memory()
+
+    @property
+    def memory_usage(self) -> int:
+        with self._lock:
+            return sum(entry.size_bytes for entry in self._entries.values())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _enforce_budget(self) -> None:
+        if self.memory_budget is None:
+            return
+        evicted = False
+        # Always keep the most recently used pipeline, even if it alone exceeds the budget
+        while len(self._entries) > 1 and sum(e.size_bytes for e in self._entries.values()) > self.memory_budget:
+            self._entries.popitem(last=False)
+            evicted = True
+        if evicted:
+            _release_device_memory()
+
+
+def _release_device_memory() -> None:
+    # Nothing can be on a device if torch was never imported
+    if torch.loaded and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+_default_pool = PipelinePool()
+
+
+def get_pipeline_pool() -> PipelinePool:
+    """Return the pool used by LocalImageGenerator instances that were not given their own."""
+    return _default_pool
+
+
+__all__ = ["PipelinePool", "WARMUP_KWARGS", "get_pipeline_pool", "pipeline_size"]
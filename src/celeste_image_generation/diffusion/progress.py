@@ -0,0 +1,128 @@
+"""
+Step-level progress, previews and cancellation for diffusers pipelines.
+"""
+
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from celeste_core import ImageArtifact
+from PIL import Image
+
+from ..lazy import lazy_import
+
+if TYPE_CHECKING:
+    import torch
+else:
+    torch = lazy_import("torch")
+
+# Linear latent -> RGB projections (one row per latent channel), close enough to the VAE
+# decode for a preview at latent resolution for a fraction of a millisecond
+_SD_LATENT_RGB = (
+    (0.3512, 0.2297, 0.3227),
+    (0.3250, 0.4974, 0.2350),
+    (-0.2829, 0.1762, 0.2721),
+    (-0.2120, -0.2616, -0.7177),
+)
+_SD_LATENT_BIAS = (0.0, 0.0, 0.0)
+_SDXL_LATENT_RGB = (
+    (0.3651, 0.4232, 0.4341),
+    (-0.2533, -0.0042, 0.1068),
+    (0.1076, 0.1111, -0.0362),
+    (-0.3165, -0.2492, -0.2188),
+)
+_SDXL_LATENT_BIAS = (0.1084, -0.0175, -0.0011)
+
+
+class GenerationCancelledError(Exception):
+    """Raised inside the pipeline loop to abandon a generation nobody is waiting for."""
+
+
+@dataclass
+class GenerationProgress:
+    """One progress event. The final event has every step done and carries the ``artifacts``."""
+
+    step: int
+    total_steps: int | None
+    elapsed: float
+    eta: float | None
+    preview: Image.Image | None = None
+    artifacts: list[ImageArtifact] | None = None
+
+    @property
+    def done(self) -> bool:
+        return self.artifacts is not None
+
+
+def latent_preview(pipeline: Any, latents: "torch.Tensor") -> Image.Image | None:
+    """Approximate the first image of a batch from its latents, at 1/8 of the output size.
+
+    Only 4-channel (SD 1.x/2.x and SDXL) latents are supported; other pipelines get None.
+    """
+    if latents.ndim != 4 or latents.shape[1] != 4:
+        return None
+    xl = getattr(pipeline, "text_encoder_2", None) is not None
+    factors, bias = (_SDXL_LATENT_RGB, _SDXL_LATENT_BIAS) if xl else (_SD_LATENT_RGB, _SD_LATENT_BIAS)
+    weight = torch.tensor(factors, dtype=torch.float32, device=latents.device)
+    offset = torch.tensor(bias, dtype=torch.float32, device=latents.device)
+    rgb = latents[0].float().permute(1, 2, 0) @ weight + offset
+    pixels = ((rgb.clamp(-1, 1) + 1) * 127.5).to(torch.uint8).cpu().numpy()
+    return Image.fromarray(pixels)
+
+
+class StepTracker:
+    """A diffusers ``callback_on_step_end`` that reports progress and honours cancellation.
+
+    ``emit`` receives a GenerationProgress after every step, with a preview every
+    ``preview_every`` steps (0 disables previews). It is called on the inference thread. After
+    ``cancel()`` the next step raises GenerationCancelledError, which ends the pipeline loop.
+    """
+
+    def __init__(
+        self,
+        emit: Callable[[GenerationProgress], None],
+        *,
+        preview_every: int = 0,
+        total_steps: int | None = None,
+    ) -> None:
+        self.emit = emit
+        self.preview_every = preview_every
+        self.total_steps = total_steps
+        self.started = time.perf_counter()
+        self._first_step: tuple[int, float] | None = None
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    def __call__(self, pipeline: Any, step: int, _timestep: Any, callback_kwargs: dict[str, Any]) -> dict[str, Any]:
+        if self._cancelled.is_set():
+            raise GenerationCancelledError
+        now = time.perf_counter()
+        done = step + 1
+        total = getattr(pipeline, "num_timesteps", None) or self.total_steps
+
+        # Time per step is measured from the first step, leaving out pipeline load and text encoding
+        eta = None
+        if self._first_step is None:
+            self._first_step = (done, now)
+        elif total is not None:
+            first_done, first_at = self._first_step
+            eta = (now - first_at) / (done - first_done) * max(total - done, 0)
+
+        preview = None
+        latents = callback_kwargs.get("latents")
+        if self.preview_every > 0 and done % self.preview_every == 0 and latents is not None:
+            preview = latent_preview(pipeline, latents)
+
+        self.emit(GenerationProgress(done, total, now - self.started, eta, preview))
+        return callback_kwargs
+
+
+__all__ = ["GenerationCancelledError", "GenerationProgress", "StepTracker", "latent_preview"]
@@ -0,0 +1,108 @@
+"""
+Concurrent, streamed retrieval of generated images for providers that return URLs or file handles.
+"""
+
+import asyncio
+import os
+from collections.abc import AsyncIterable, Awaitable, Callable, Sequence
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from .instrumentation import record_size
+from .sessions import SessionPool
+from .storage import ArtifactStore
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+DEFAULT_MAX_CONCURRENT_DOWNLOADS = 4
+
+# Where to put image ``index`` of a response instead of buffering it: a file path, or an open
+# binary file / buffer that the caller owns
+Destination = Callable[[int], str | os.PathLike[str] | BinaryIO]
+
+
+async def stream_url(session_pool: SessionPool, url: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterable[bytes]:
+    """Yield the body of ``url`` in chunks through the pooled session."""
+    async with session_pool.session().get(url) as response:
+        response.raise_for_status()
+        async for chunk in response.content.iter_chunked(chunk_size):
+            yield chunk
+
+
+async def _write(chunks: AsyncIterable[bytes], sink: BinaryIO) -> int:
+    size = 0
+    async for chunk in chunks:
+        # Buffered writes land in the page cache; not worth a thread hop per chunk
+        sink.write(chunk)
+        size += len(chunk)
+    return size
+
+
+async def store(
+    source: bytes | AsyncIterable[bytes],
+    destination: Destination | None,
+    index: int,
+    artifact_store: ArtifactStore | None = None,
+) -> tuple[bytes | None, dict[str, Any]]:
+    """Deliver one image: return its bytes, or write it to ``destination(index)`` and return None.
+
+    Without a destination, an ``artifact_store`` may spill large images to disk. The second
+    value is metadata to merge into the artifact, such as the ``path`` written to.
+    """
+    if destination is None:
+        if artifact_store is not None:
+            data, extra = await artifact_store.save(source)
+        else:
+            data = source if isinstance(source, bytes) else b"".join([chunk async for chunk in source])
+            extra = {}
+        record_size("image", len(data) if data is not None else extra["payload"].size)
+        return data, extra
+
+    if isinstance(source, bytes):
+        source = _once(source)
+
+    target = destination(index)
+    if isinstance(target, str | os.PathLike):
+        path = Path(target)
+        try:
+            with path.open("wb") as sink:
+                record_size("image", await _write(source, sink))
+        except BaseException:
+            path.unlink(missing_ok=True)  # don't leave a truncated image behind
+            raise
+        return None, {"path": str(path)}
+    record_size("image", await _write(source, target))
+    return None, {}
+
+
+async def _once(data: bytes) -> AsyncIterable[bytes]:
+    yield data
+
+
+async def gather_bounded(calls: Sequence[Callable[[], Awaitable[Any]]], limit: int) -> list[Any]:
+    """Run ``calls`` at most ``limit`` at a time, returning results in order.
+
+    The first error cancels the remaining calls.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(call: Callable[[], Awaitable[Any]]) -> Any:
+        async with semaphore:
+            return await call()
+
+    tasks = [asyncio.ensure_future(run(call)) for call in calls]
+    try:
+        # Plain gather, not a TaskGroup, so callers see the original error rather than a group
+        return list(await asyncio.gather(*tasks))
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+__all__ = [
+    "DEFAULT_CHUNK_SIZE",
+    "DEFAULT_MAX_CONCURRENT_DOWNLOADS",
+    "Destination",
+    "gather_bounded",
+    "store",
+    "stream_url",
+]
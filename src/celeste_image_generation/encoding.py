@@ -0,0 +1,80 @@
+"""
+Off-loop image encoding shared by providers that produce decoded PIL images.
+"""
+
+import asyncio
+import io
+import os
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+from PIL import Image
+
+# Uncompressed 8-bit RGB pixels, e.g. np.frombuffer(data, np.uint8).reshape(height, width, 3)
+RAW = "RAW"
+# No encoding at all: the PIL image is returned in metadata["image"] and data is None
+DECODED = "DECODED"
+
+
+@dataclass(frozen=True)
+class ImageEncoding:
+    format: str = "PNG"
+    quality: int | None = None  # JPEG / WebP
+    compress_level: int | None = None  # PNG, 0 (fastest) to 9 (smallest)
+    lossless: bool = False  # WebP
+    optimize: bool = False
+
+    @classmethod
+    def parse(cls, value: "ImageEncoding | str") -> "ImageEncoding":
+        return value if isinstance(value, ImageEncoding) else cls(format=value)
+
+    def save_options(self) -> dict[str, Any]:
+        options: dict[str, Any] = {"optimize": self.optimize}
+        if self.quality is not None:
+            options["quality"] = self.quality
+        if self.compress_level is not None:
+            options["compress_level"] = self.compress_level
+        if self.lossless:
+            options["lossless"] = True
+        return options
+
+
+def encode_image(image: Image.Image, encoding: ImageEncoding) -> tuple[bytes | None, dict[str, Any]]:
+    """Encode one image, returning its bytes and format metadata."""
+    fmt = encoding.format.upper()
+    if fmt == DECODED:
+        return None, {"format": DECODED, "image": image}
+    if fmt == RAW:
+        rgb = image if image.mode == "RGB" else image.convert("RGB")
+        return rgb.tobytes(), {"format": RAW, "mode": "RGB", "width": rgb.width, "height": rgb.height}
+
+    if fmt == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    buf = io.BytesIO()
+    image.save(buf, format=fmt, **encoding.save_options())
+    return buf.getvalue(), {"format": fmt}
+
+
+# Pillow releases the GIL while compressing, so threads encode in parallel
+_default_executor = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1), thread_name_prefix="celeste-encode")
+
+
+async def encode_images(
+    images: list[Image.Image],
+    encoding: ImageEncoding,
+    executor: Executor | None = None,
+) -> list[tuple[bytes | None, dict[str, Any]]]:
+    """Encode images concurrently off the event loop.
+
+    ``executor`` defaults to a shared thread pool; a ProcessPoolExecutor also works, since
+    encode_image and PIL images are picklable.
+    """
+    if encoding.format.upper() == DECODED:
+        return [encode_image(image, encoding) for image in images]
+    loop = asyncio.get_running_loop()
+    pool = executor or _default_executor
+    return list(await asyncio.gather(*(loop.run_in_executor(pool, encode_image, img, encoding) for img in images)))
+
+
+__all__ = ["DECODED", "RAW", "ImageEncoding", "encode_image", "encode_images"]
@@ -0,0 +1,113 @@
+import importlib
+import inspect
+import os
+from typing import Any
+
+from celeste_core import Provider
+from celeste_core.base.image_generator import BaseImageGenerator
+
+from .cache import CachedImageGenerator, ResultCache
+from .instrumentation import InstrumentedImageGenerator
+from .lazy import lazy_import
+from .mapping import PROVIDER_MAPPING
+from .params import ValidatingImageGenerator
+from .resilience import ResilientImageGenerator, RetryPolicy
+from .singleflight import SingleFlightImageGenerator
+
+# Loading settings reads the environment, so defer it until a generator is created
+celeste_settings = lazy_import("celeste_core.config.settings")
+
+_generator_classes: dict[Provider, type[BaseImageGenerator]] = {}
+
+
+def get_generator_class(provider: Provider) -> type[BaseImageGenerator]:
+    """Import the generator class for ``provider`` once and cache it."""
+    generator_class = _generator_classes.get(provider)
+    if generator_class is None:
+        if provider not in PROVIDER_MAPPING:
+            raise ValueError(f"Unsupported provider: {provider}")
+        module_path, class_name = PROVIDER_MAPPING[provider]
+        module = importlib.import_module(f".{module_path}", __package__)
+        generator_class = _generator_classes[provider] = getattr(module, class_name)
+    return generator_class
+
+
+def default_model(provider: Provider) -> str | None:
+    """The model a provider's generator uses when none is passed."""
+    parameter = inspect.signature(get_generator_class(provider)).parameters.get("model")
+    if parameter is None or not isinstance(parameter.default, str):
+        return None
+    return parameter.default
+
+
+def _accepts_api_key(generator_class: type[BaseImageGenerator]) -> bool:
+    """Whether the generator authenticates with an ``api_key`` passed to its constructor."""
+    return "api_key" in inspect.signature(generator_class).parameters
+
+
+def _requires_api_key(provider: Provider) -> bool:
+    """Whether ``provider`` can only authenticate with an API key from the settings."""
+    if provider is Provider.LOCAL:
+        return False
+    # google-genai uses Application Default Credentials when configured for Vertex AI
+    if provider is Provider.GOOGLE:
+        return os.environ.get("GOOGLE_GENAI_USE_VERTEXAI", "").lower() not in ("1", "true")
+    return True
+
+
+def create_image_generator(
+    provider: str | Provider,
+    cache: ResultCache | None = None,
+    cache_unseeded: bool = False,
+    single_flight: bool = False,
+    retry: RetryPolicy | None = RetryPolicy(),  # noqa: B008 - immutable
+    *,
+    validate: bool = True,
+    **kwargs: Any,
+) -> "BaseImageGenerator":
+    """
+    Factory function to create an image generator instance based on the provider.
+
+    Args:
+        provider: The image generator provider to use (string or Provider enum).
+        cache: Optional ResultCache serving repeated requests from disk.
+        cache_unseeded: Also cache requests without a seed (non-deterministic results).
+        single_flight: Coalesce identical concurrent requests into one upstream call.
+        retry: Retry/circuit-breaker policy for transient provider errors; None disables it.
+            Only idempotent providers (local) retry whole calls unless the policy sets
+            ``retry_non_idempotent``, since a retried paid call can be billed twice; the others
+            still retry requests the provider throttled or never received.
+        validate: Check kwargs against the provider's parameter schema before dispatch, and
+            pass them on in canonical form.
+        **kwargs: Additional arguments to pass to the image generator constructor.
+
+    Returns:
+        An instance of an image generator
+    """
+    # Normalize to enum
+    provider_enum: Provider = provider if isinstance(provider, Provider) else Provider(provider)
+
+    generator_class = get_generator_class(provider_enum)
+
+    # Validate environment for providers that need a key, unless one is passed to a generator
+    # that uses it (others would silently ignore it and still read the settings)
+    passed_key = "api_key" in kwargs and _accepts_api_key(generator_class)
+    if not passed_key and _requires_api_key(provider_enum):
+        celeste_settings.settings.validate_for_provider(provider_enum.value)
+
+    generator = generator_class(**kwargs)
+    if retry is not None:
+        generator = ResilientImageGenerator(generator, retry)
+    if cache is not None:
+        generator = CachedImageGenerator(generator, cache, cache_unseeded=cache_unseeded)
+    if single_flight:
+        # Outermost, so a burst of identical cache misses still makes a single upstream call
+        generator = SingleFlightImageGenerator(generator)
+    if validate:
+        # Above every other layer: invalid requests cost no retries, tokens or cache lookups
+        generator = ValidatingImageGenerator(generator)
+    # Cheap pass-through unless instrumentation is enabled
+    return InstrumentedImageGenerator(generator)
+
+
+__all__ = ["create_image_generator", "default_model", "get_generator_class"]
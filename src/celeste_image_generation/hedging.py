@@ -0,0 +1,160 @@
+"""
+Composite generators that hedge or race requests across providers to bound tail latency.
+"""
+
+import asyncio
+import bisect
+import math
+import time
+from collections import Counter
+from typing import Any, Literal
+
+from celeste_core import ImageArtifact, Provider
+from celeste_core.base.image_generator import BaseImageGenerator
+
+from .factory import create_image_generator
+from .wrapper import ImageGeneratorWrapper
+
+HedgeMode = Literal["hedge", "race"]
+
+
+class LatencyHistogram:
+    """Log-scale latency histogram (50 ms to ~30 min, ~10% resolution) with percentiles."""
+
+    _BOUNDS = [0.05 * 1.1**i for i in range(140)]
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(self._BOUNDS) + 1)
+        self.total = 0
+
+    def record(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self._BOUNDS, seconds)] += 1
+        self.total += 1
+
+    def percentile(self, q: float) -> float | None:
+        """Upper bound of the bucket holding the q-th quantile, or None with no samples."""
+        if self.total == 0:
+            return None
+        rank = math.ceil(q * self.total)
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self._BOUNDS[min(i, len(self._BOUNDS) - 1)]
+        return self._BOUNDS[-1]
+
+
+class HedgedImageGenerator(ImageGeneratorWrapper):
+    """Sends a request to several generators and returns the first successful result.
+
+    In ``"hedge"`` mode the next generator is started only when the current ones have run
+    longer than their learned ``hedge_percentile`` latency (``default_hedge_delay`` until
+    ``min_samples`` calls have been observed), or as soon as one fails. Calls that were
+    cancelled or failed count with the time they ran. In ``"race"``
+    mode every allowed generator starts at once. Either way at most ``max_extra_calls``
+    calls beyond the first are made, and losing calls are cancelled.
+
+    Generation kwargs are passed to every generator, so they should be ones all of them
+    accept; provider-specific options belong in each generator's construction.
+    """
+
+    def __init__(
+        self,
+        generators: list[BaseImageGenerator],
+        mode: HedgeMode = "hedge",
+        *,
+        hedge_percentile: float = 0.95,
+        default_hedge_delay: float = 10.0,
+        min_samples: int = 20,
+        max_extra_calls: int = 1,
+    ) -> None:
+        if not generators:
+            raise ValueError("At least one generator is required")
+        super().__init__(generators[0])
+        self.generators = generators
+        self.mode = mode
+        self.hedge_percentile = hedge_percentile
+        self.default_hedge_delay = default_hedge_delay
+        self.min_samples = min_samples
+        self.max_extra_calls = max_extra_calls
+        self.histograms = [LatencyHistogram() for _ in generators]
+        self.wins: Counter[int] = Counter()
+        self.extra_calls = 0
+
+    def hedge_delay(self, index: int) -> float:
+        histogram = self.histograms[index]
+        if histogram.total < self.min_samples:
+            return self.default_hedge_delay
+        return histogram.percentile(self.hedge_percentile) or self.default_hedge_delay
+
+    async def _timed(self, index: int, prompt: str, kwargs: dict[str, Any]) -> list[ImageArtifact]:
+        start = time.monotonic()
+        try:
+            artifacts: list[ImageArtifact] = await self.generators[index].generate_image(prompt, **kwargs)
+        finally:
+            # Cancelled (lost the race) and failed calls are the slow tail: leaving them out
+            # would shrink the learned delay and hedge ever more often. Their elapsed time is
+            # a lower bound on the latency they would have had
+            self.histograms[index].record(time.monotonic() - start)
+        return artifacts
+
+    async def generate_image(self, prompt: str, **kwargs: Any) -> list[ImageArtifact]:
+        call_limit = min(len(self.generators), 1 + self.max_extra_calls)
+        running: dict[asyncio.Task[list[ImageArtifact]], int] = {}
+        started = 0
+        last_error: BaseException | None = None
+
+        def start_next() -> None:
+            nonlocal started
+            task = asyncio.create_task(self._timed(started, prompt, kwargs))
+            running[task] = started
+            if started:
+                self.extra_calls += 1
+            started += 1
+
+        try:
+            start_next()
+            while self.mode == "race" and started < call_limit:
+                start_next()
+
+            while running:
+                newest = running[next(reversed(running))]
+                timeout = self.hedge_delay(newest) if started < call_limit else None
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    index = running.pop(task)
+                    last_error = task.exception()
+                    if last_error is None:
+                        self.wins[index] += 1
+                        return task.result()
+                # Timed out waiting, or a call failed: bring in the next generator if allowed
+                if started < call_limit:
+                    start_next()
+        finally:
+            for task in running:
+                task.cancel()
+
+        raise last_error or RuntimeError("No generator produced a result")
+
+
+def create_hedged_generator(
+    providers: list[str | Provider | tuple[str | Provider, dict[str, Any]]],
+    mode: HedgeMode = "hedge",
+    **options: Any,
+) -> HedgedImageGenerator:
+    """
+    Build a HedgedImageGenerator from PROVIDER_MAPPING entries, in preference order.
+
+    Args:
+        providers: Provider names, or (provider, constructor kwargs) pairs.
+        mode: "hedge" to add providers after a learned latency percentile, "race" to start all.
+        **options: HedgedImageGenerator options such as max_extra_calls or hedge_percentile.
+    """
+    generators = [
+        create_image_generator(spec[0], **spec[1]) if isinstance(spec, tuple) else create_image_generator(spec)
+        for spec in providers
+    ]
+    return HedgedImageGenerator(generators, mode, **options)
+
+
+__all__ = ["HedgeMode", "HedgedImageGenerator", "LatencyHistogram", "create_hedged_generator"]
@@ -0,0 +1,315 @@
+"""
+Per-stage timings, payload sizes and retry counts for generate_image calls.
+
+Instrumentation is off by default, and then ``stage()`` returns a shared no-op context
+manager. Once enabled (directly or by adding an exporter), every generate_image call made
+through create_image_generator records a Trace. The breakdown is attached to each artifact
+as ``metadata["timings"]`` and passed to the registered exporters.
+"""
+
+import contextlib
+import logging
+import time
+from collections import defaultdict
+from collections.abc import Callable
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from types import SimpleNamespace, TracebackType
+from typing import TYPE_CHECKING, Any
+
+from celeste_core import ImageArtifact
+
+from .lazy import lazy_import
+from .wrapper import ImageGeneratorWrapper
+
+# Only the pooled HTTP sessions need the trace hooks, and they import aiohttp themselves
+if TYPE_CHECKING:
+    import aiohttp
+else:
+    aiohttp = lazy_import("aiohttp")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Trace:
+    provider: str
+    model: str | None
+    stages: dict[str, float] = field(default_factory=dict)
+    sizes: dict[str, int] = field(default_factory=dict)
+    counters: dict[str, int] = field(default_factory=dict)
+    started: float = field(default_factory=time.perf_counter)
+    duration: float | None = None
+    error: str | None = None
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def add_size(self, name: str, size: int) -> None:
+        self.sizes[name] = self.sizes.get(name, 0) + size
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def as_metadata(self) -> dict[str, Any]:
+        return {
+            "total": self.duration,
+            "stages": dict(self.stages),
+            "bytes": dict(self.sizes),
+            "counters": dict(self.counters),
+        }
+
+
+Exporter = Callable[[Trace], None]
+
+
+class _Instrumentation:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.exporters: list[Exporter] = []
+
+
+_instrumentation = _Instrumentation()
+_current: ContextVar[Trace | None] = ContextVar("celeste_image_generation_trace", default=None)
+_NOOP = contextlib.nullcontext()
+
+
+def enable_instrumentation(enabled: bool = True) -> None:
+    _instrumentation.enabled = enabled
+
+
+def add_exporter(exporter: Exporter) -> None:
+    """Register a callback receiving every finished Trace; enables instrumentation."""
+    _instrumentation.exporters.append(exporter)
+    _instrumentation.enabled = True
+
+
+def remove_exporter(exporter: Exporter) -> None:
+    _instrumentation.exporters.remove(exporter)
+
+
+def current_trace() -> Trace | None:
+    return _current.get()
+
+
+class _StageTimer:
+    __slots__ = ("name", "start", "trace")
+
+    def __init__(self, trace: Trace, name: str) -> None:
+        self.trace = trace
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.trace.add_stage(self.name, time.perf_counter() - self.start)
+
+
+def stage(name: str) -> contextlib.AbstractContextManager[None]:
+    """Time the enclosed block as ``name`` in the current trace, if there is one."""
+    trace = _current.get()
+    return _NOOP if trace is None else _StageTimer(trace, name)
+
+
+def record_stage(name: str, seconds: float) -> None:
+    trace = _current.get()
+    if trace is not None:
+        trace.add_stage(name, seconds)
+
+
+def record_size(name: str, size: int) -> None:
+    trace = _current.get()
+    if trace is not None:
+        trace.add_size(name, size)
+
+
+def increment(name: str, amount: int = 1) -> None:
+    trace = _current.get()
+    if trace is not None:
+        trace.increment(name, amount)
+
+
+class InstrumentedImageGenerator(ImageGeneratorWrapper):
+    """Starts a Trace around each call while instrumentation is enabled."""
+
+    async def generate_image(self, prompt: str, **kwargs: Any) -> list[ImageArtifact]:
+        artifacts: list[ImageArtifact]
+        if not _instrumentation.enabled:
+            artifacts = await self.generator.generate_image(prompt, **kwargs)
+            return artifacts
+
+        trace = Trace(provider=getattr(self.provider, "value", str(self.provider)), model=self.model)
+        token = _current.set(trace)
+        try:
+            artifacts = await self.generator.generate_image(prompt, **kwargs)
+        except Exception as exc:
+            trace.error = type(exc).__name__
+            raise
+        finally:
+            _current.reset(token)
+            trace.duration = time.perf_counter() - trace.started
+            _export(trace)
+
+        timings = trace.as_metadata()
+        for artifact in artifacts:
+            artifact.metadata = {**(artifact.metadata or {}), "timings": timings}
+        return artifacts
+
+
+def _export(trace: Trace) -> None:
+    for exporter in _instrumentation.exporters:
+        try:
+            exporter(trace)
+        except Exception:
+            logger.exception("Instrumentation exporter %r failed", exporter)
+
+
+# aiohttp hooks feeding connection-level stages of the pooled session into the current trace
+
+
+async def _on_request_start(
+    _session: "aiohttp.ClientSession", ctx: SimpleNamespace, _params: "aiohttp.TraceRequestStartParams"
+) -> None:
+    ctx.request_start = time.perf_counter()
+
+
+async def _on_request_end(
+    _session: "aiohttp.ClientSession", ctx: SimpleNamespace, _params: "aiohttp.TraceRequestEndParams"
+) -> None:
+    record_stage("http_request", time.perf_counter() - ctx.request_start)
+
+
+async def _on_request_chunk_sent(
+    _session: "aiohttp.ClientSession", _ctx: SimpleNamespace, params: "aiohttp.TraceRequestChunkSentParams"
+) -> None:
+    record_size("upload", len(params.chunk))
+
+
+async def _on_connection_create_start(
+    _session: "aiohttp.ClientSession", ctx: SimpleNamespace, _params: "aiohttp.TraceConnectionCreateStartParams"
+) -> None:
+    ctx.connect_start = time.perf_counter()
+
+
+async def _on_connection_create_end(
+    _session: "aiohttp.ClientSession", ctx: SimpleNamespace, _params: "aiohttp.TraceConnectionCreateEndParams"
+) -> None:
+    record_stage("connect", time.perf_counter() - ctx.connect_start)
+
+
+async def _on_dns_resolvehost_start(
+    _session: "aiohttp.ClientSession", ctx: SimpleNamespace, _params: "aiohttp.TraceDnsResolveHostStartParams"
+) -> None:
+    ctx.dns_start = time.perf_counter()
+
+
+async def _on_dns_resolvehost_end(
+    _session: "aiohttp.ClientSession", ctx: SimpleNamespace, _params: "aiohttp.TraceDnsResolveHostEndParams"
+) -> None:
+    record_stage("dns", time.perf_counter() - ctx.dns_start)
+
+
+def http_trace_config() -> "aiohttp.TraceConfig":
+    config = aiohttp.TraceConfig()
+    config.on_request_start.append(_on_request_start)
+    config.on_request_end.append(_on_request_end)
+    config.on_request_chunk_sent.append(_on_request_chunk_sent)
+    config.on_connection_create_start.append(_on_connection_create_start)
+    config.on_connection_create_end.append(_on_connection_create_end)
+    config.on_dns_resolvehost_start.append(_on_dns_resolvehost_start)
+    config.on_dns_resolvehost_end.append(_on_dns_resolvehost_end)
+    return config
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class PrometheusExporter:
+    """Aggregates traces and renders them in the Prometheus text exposition format."""
+
+    prefix = "celeste_image_generation"
+
+    def __init__(self) -> None:
+        self.requests: defaultdict[tuple[str, ...], int] = defaultdict(int)
+        self.stage_sum: defaultdict[tuple[str, ...], float] = defaultdict(float)
+        self.stage_count: defaultdict[tuple[str, ...], int] = defaultdict(int)
+        self.bytes: defaultdict[tuple[str, ...], int] = defaultdict(int)
+        self.events: defaultdict[tuple[str, ...], int] = defaultdict(int)
+
+    def __call__(self, trace: Trace) -> None:
+        base = (trace.provider, trace.model or "")
+        self.requests[(*base, trace.error or "ok")] += 1
+        for name, seconds in {**trace.stages, "total": trace.duration or 0.0}.items():
+            self.stage_sum[(*base, name)] += seconds
+            self.stage_count[(*base, name)] += 1
+        for name, size in trace.sizes.items():
+            self.bytes[(*base, name)] += size
+        for name, amount in trace.counters.items():
+            self.events[(*base, name)] += amount
+
+    def _lines(self, metric: str, kind: str, label: str, values: dict[tuple[str, ...], Any]) -> list[str]:
+        lines = [f"# TYPE {self.prefix}_{metric} {kind}"] if kind else []
+        for (provider, model, name), value in sorted(values.items()):
+            labels = f'provider="{_escape(provider)}",model="{_escape(model)}",{label}="{_escape(name)}"'
+            lines.append(f"{self.prefix}_{metric}{{{labels}}} {value}")
+        return lines
+
+    def render(self) -> str:
+        lines = [
+            *self._lines("requests_total", "counter", "outcome", self.requests),
+            f"# TYPE {self.prefix}_stage_seconds summary",
+            *self._lines("stage_seconds_sum", "", "stage", self.stage_sum),
+            *self._lines("stage_seconds_count", "", "stage", self.stage_count),
+            *self._lines("bytes_total", "counter", "kind", self.bytes),
+            *self._lines("events_total", "counter", "event", self.events),
+        ]
+        return "\n".join(lines) + "\n"
+
+
+class OpenTelemetryExporter:
+    """Records traces as OpenTelemetry metrics. Requires the ``opentelemetry-api`` package."""
+
+    def __init__(self, meter_name: str = "celeste_image_generation") -> None:
+        try:
+            from opentelemetry import metrics  # noqa: PLC0415 - optional dependency
+        except ImportError as exc:
+            raise ImportError("OpenTelemetryExporter requires 'opentelemetry-api'") from exc
+
+        meter = metrics.get_meter(meter_name)
+        self.stage_seconds = meter.create_histogram("image_generation.stage.duration", unit="s")
+        self.bytes = meter.create_counter("image_generation.bytes", unit="By")
+        self.events = meter.create_counter("image_generation.events")
+
+    def __call__(self, trace: Trace) -> None:
+        base = {"provider": trace.provider, "model": trace.model or "", "outcome": trace.error or "ok"}
+        for name, seconds in {**trace.stages, "total": trace.duration or 0.0}.items():
+            self.stage_seconds.record(seconds, {**base, "stage": name})
+        for name, size in trace.sizes.items():
+            self.bytes.add(size, {**base, "kind": name})
+        for name, amount in trace.counters.items():
+            self.events.add(amount, {**base, "event": name})
+
+
+__all__ = [
+    "InstrumentedImageGenerator",
+    "OpenTelemetryExporter",
+    "PrometheusExporter",
+    "Trace",
+    "add_exporter",
+    "current_trace",
+    "enable_instrumentation",
+    "http_trace_config",
+    "increment",
+    "record_size",
+    "record_stage",
+    "remove_exporter",
+    "stage",
+]
@@ -0,0 +1,498 @@
+"""
+Durable job queue: generations recorded in a SQLite file and run by a pool of worker processes.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from enum import StrEnum
+from functools import partial
+from pathlib import Path
+from types import FrameType
+from typing import Any
+
+from celeste_core import ImageArtifact, Provider
+
+from .factory import default_model
+from .params import validate_request
+from .registry import GeneratorRegistry
+from .sessions import close_sessions
+from .storage import ArtifactStore, SpilledPayload, spilled_payload
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    provider TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    options TEXT NOT NULL,
+    kwargs TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    checkpoint TEXT,
+    error TEXT,
+    results TEXT,
+    worker TEXT,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_state ON jobs (state, created_at);
+"""
+
+# Artifact metadata that refers to in-process objects rather than describing the image
+_TRANSIENT_METADATA = frozenset({"payload", "path", "image"})
+
+
+class JobState(StrEnum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+@dataclass
+class Job:
+    id: str
+    provider: str
+    prompt: str
+    options: dict[str, Any]
+    kwargs: dict[str, Any]
+    state: JobState
+    attempts: int
+    max_attempts: int
+    checkpoint: str | None = None
+    error: str | None = None
+    results: list[dict[str, Any]] = field(default_factory=list)
+    created_at: float = 0.0
+    updated_at: float = 0.0
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (JobState.SUCCEEDED, JobState.FAILED, JobState.CANCELLED)
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "Job":
+        return cls(
+            id=row["id"],
+            provider=row["provider"],
+            prompt=row["prompt"],
+            options=json.loads(row["options"]),
+            kwargs=json.loads(row["kwargs"]),
+            state=JobState(row["state"]),
+            attempts=row["attempts"],
+            max_attempts=row["max_attempts"],
+            checkpoint=row["checkpoint"],
+            error=row["error"],
+            results=json.loads(row["results"]) if row["results"] else [],
+            created_at=row["created_at"],
+            updated_at=row["updated_at"],
+        )
+
+
+class JobQueue:
+    """Generation jobs persisted in a SQLite database shared by clients and worker processes.
+
+    ``submit`` records a job and returns its ID. Workers claim jobs under a lease of ``lease``
+    seconds that they keep renewing, so the jobs of a worker that dies (crash, deploy) become
+    claimable again once the lease runs out; a job is retried up to ``max_attempts`` times.
+    Provider-side job IDs (e.g. Luma generations) are checkpointed, so a resumed job polls the
+    existing generation instead of paying for a new one.
+    """
+
+    def __init__(self, path: str | os.PathLike[str], *, lease: float = 300.0) -> None:
+        self.path = Path(path)
+        self.lease = lease
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        # WAL lets clients read status while workers write
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _execute(self, sql: str, params: tuple[Any, ...] = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    # Client API
+
+    async def submit(
+        self,
+        provider: str | Provider,
+        prompt: str,
+        *,
+        options: dict[str, Any] | None = None,
+        max_attempts: int = 3,
+        **kwargs: Any,
+    ) -> str:
+        """Queue a generation and return its job ID.
+
+        ``options`` are passed to create_image_generator (``model``, ``cpu_profile``, ...) and
+        ``kwargs`` to generate_image; both must be JSON-serializable. Unless ``options`` turn
+        validation off, ``kwargs`` are checked here, so an invalid request raises
+        InvalidRequestError instead of being queued to fail on a worker.
+        """
+        provider_enum = provider if isinstance(provider, Provider) else Provider(provider)
+        options = options or {}
+        if options.get("validate", True):
+            validate_request(provider_enum, options.get("model") or default_model(provider_enum), prompt, kwargs)
+        provider_value = provider_enum.value
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        row = (job_id, provider_value, prompt, json.dumps(options), json.dumps(kwargs), max_attempts, now, now)
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT INTO jobs (id, provider, prompt, options, kwargs, state, max_attempts, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, 'queued', ?, ?, ?)",
+            row,
+        )
+        return job_id
+
+    def get_job(self, job_id: str) -> Job:
+        row = self._execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise KeyError(job_id)
+        return Job.from_row(row)
+
+    async def status(self, job_id: str) -> Job:
+        """The current state of a job. Raises KeyError for unknown IDs."""
+        return await asyncio.to_thread(self.get_job, job_id)
+
+    async def wait(self, job_id: str, *, poll_interval: float = 0.5, timeout: float | None = None) -> Job:
+        """Wait until a job succeeds, fails or is cancelled."""
+        async with asyncio.timeout(timeout):
+            while not (job := await self.status(job_id)).finished:
+                await asyncio.sleep(poll_interval)
+        return job
+
+    async def result(self, job_id: str) -> list[ImageArtifact]:
+        """The artifacts of a succeeded job, as spilled payloads in the worker's artifact store."""
+        job = await self.status(job_id)
+        if job.state is not JobState.SUCCEEDED:
+            detail = f": {job.error}" if job.error else ""
+            raise RuntimeError(f"Job {job_id} is {job.state}{detail}")
+        return [
+            ImageArtifact(
+                data=None,
+                metadata={
+                    **record["metadata"],
+                    "payload": SpilledPayload(Path(record["path"]), record["size"]),
+                    "path": record["path"],
+                    "job_id": job_id,
+                },
+            )
+            for record in job.results
+        ]
+
+    async def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; a running one stops at its worker's next heartbeat."""
+        cursor = await asyncio.to_thread(
+            self._execute,
+            "UPDATE jobs SET state = 'cancelled', lease_until = NULL, updated_at = ?"
+            " WHERE id = ? AND state IN ('queued', 'running')",
+            (time.time(), job_id),
+        )
+        return cursor.rowcount > 0
+
+    def counts(self) -> dict[JobState, int]:
+        rows = self._execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        return {JobState(state): count for state, count in rows}
+
+    # Worker API (blocking; workers call these from a thread)
+
+    def claim(self, worker: str) -> Job | None:
+        """Lease the oldest queued job, or one whose worker's lease ran out."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    now = time.time()
+                    row = self._conn.execute(
+                        "SELECT * FROM jobs WHERE state = 'queued' OR (state = 'running' AND lease_until < ?)"
+                        " ORDER BY created_at LIMIT 1",
+                        (now,),
+                    ).fetchone()
+                    if row is None:
+                        job = None
+                        break
+                    if row["attempts"] >= row["max_attempts"]:
+                        # Only reachable through expired leases: the job keeps killing its workers
+                        self._conn.execute(
+                            "UPDATE jobs SET state = 'failed', error = ?, lease_until = NULL, updated_at = ?"
+                            " WHERE id = ?",
+                            (f"Worker lost after {row['attempts']} attempts", now, row["id"]),
+                        )
+                        continue
+                    self._conn.execute(
+                        "UPDATE jobs SET state = 'running', attempts = attempts + 1, worker = ?, lease_until = ?,"
+                        " updated_at = ? WHERE id = ?",
+                        (worker, now + self.lease, now, row["id"]),
+                    )
+                    job = Job.from_row(self._conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone())
+                    break
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return job
+
+    def _update_owned(self, job_id: str, worker: str, assignments: str, params: tuple[Any, ...]) -> bool:
+        # Writes only land while the worker still holds the job, not after a cancel or takeover.
+        # ``assignments`` are literals from this class; values always go through parameters
+        cursor = self._execute(
+            f"UPDATE jobs SET {assignments}, updated_at = ? WHERE id = ? AND worker = ? AND state = 'running'",
+            (*params, time.time(), job_id, worker),
+        )
+        return cursor.rowcount > 0
+
+    def renew(self, job_id: str, worker: str) -> bool:
+        """Extend the lease. False means the job was cancelled or taken over."""
+        return self._update_owned(job_id, worker, "lease_until = ?", (time.time() + self.lease,))
+
+    def save_checkpoint(self, job_id: str, worker: str, checkpoint: str) -> bool:
+        return self._update_owned(job_id, worker, "checkpoint = ?", (checkpoint,))
+
+    def complete(self, job_id: str, worker: str, results: list[dict[str, Any]]) -> bool:
+        return self._update_owned(
+            job_id, worker, "state = 'succeeded', results = ?, lease_until = NULL", (json.dumps(results),)
+        )
+
+    def fail(self, job_id: str, worker: str, error: str) -> bool:
+        return self._update_owned(job_id, worker, "state = 'failed', error = ?, lease_until = NULL", (error,))
+
+    def release(self, job_id: str, worker: str) -> bool:
+        """Hand a job back on shutdown, keeping its checkpoint and not counting the attempt."""
+        return self._update_owned(
+            job_id, worker, "state = 'queued', attempts = attempts - 1, worker = NULL, lease_until = NULL", ()
+        )
+
+
+def _json_metadata(metadata: dict[str, Any] | None) -> dict[str, Any]:
+    safe = {}
+    for key, value in (metadata or {}).items():
+        if key in _TRANSIENT_METADATA:
+            continue
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError):
+            continue
+        safe[key] = value
+    return safe
+
+
+def persist_artifacts(store: ArtifactStore, artifacts: list[ImageArtifact]) -> list[dict[str, Any]]:
+    """Move or write every artifact's bytes into ``store`` and describe them as JSON records."""
+    records = []
+    for artifact in artifacts:
+        payload = spilled_payload(artifact.metadata)
+        if payload is not None:
+            payload = store.adopt(payload)
+        elif artifact.data is not None:
+            payload = store.write(artifact.data)
+        else:
+            raise ValueError("Artifact has no image bytes to persist")
+        records.append({"path": str(payload.path), "size": payload.size, "metadata": _json_metadata(artifact.metadata)})
+    return records
+
+
+class Worker:
+    """Runs queued jobs in this process, up to ``concurrency`` at a time.
+
+    Generators are created through a GeneratorRegistry, so jobs with the same provider and
+    options share one. Results go to ``results_dir`` through an ArtifactStore.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        results_dir: str | os.PathLike[str],
+        *,
+        concurrency: int = 4,
+        poll_interval: float = 0.5,
+        name: str | None = None,
+    ) -> None:
+        self.queue = queue
+        self.store = ArtifactStore(results_dir)
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.registry = GeneratorRegistry()
+        self._running: dict[str, asyncio.Task[None]] = {}
+
+    async def run(self, should_stop: Callable[[], bool]) -> None:
+        """Claim and run jobs until ``should_stop()``, then hand unfinished jobs back."""
+        heartbeat = asyncio.create_task(self._heartbeat())
+        try:
+            while not should_stop():
+                job = None
+                if len(self._running) < self.concurrency:
+                    job = await asyncio.to_thread(self.queue.claim, self.name)
+                if job is None:
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                task = asyncio.create_task(self._run_job(job))
+                self._running[job.id] = task
+                task.add_done_callback(partial(self._forget, job.id))
+        finally:
+            heartbeat.cancel()
+            tasks = list(self._running.values())
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.registry.aclose()
+            await close_sessions()
+
+    def _forget(self, job_id: str, _task: asyncio.Task[None]) -> None:
+        self._running.pop(job_id, None)
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(self.queue.lease / 3)
+            for job_id, task in list(self._running.items()):
+                try:
+                    renewed = await asyncio.to_thread(self.queue.renew, job_id, self.name)
+                except Exception:
+                    # e.g. a briefly locked database; the next beat retries before the lease ends
+                    logger.exception("Could not renew the lease on job %s", job_id)
+                    continue
+                if not renewed:
+                    task.cancel()  # cancelled by a client, or the lease was lost
+
+    async def _run_job(self, job: Job) -> None:
+        try:
+            artifacts = await self._generate(job)
+            records = await asyncio.to_thread(persist_artifacts, self.store, artifacts)
+        except asyncio.CancelledError:
+            # Shutting down (or cancelled, in which case the job is no longer ours to release)
+            await asyncio.to_thread(self.queue.release, job.id, self.name)
+            raise
+        except Exception as exc:
+            await asyncio.to_thread(self.queue.fail, job.id, self.name, f"{type(exc).__name__}: {exc}")
+            return
+        if not await asyncio.to_thread(self.queue.complete, job.id, self.name, records):
+            for record in records:
+                Path(record["path"]).unlink(missing_ok=True)
+
+    async def _generate(self, job: Job) -> list[ImageArtifact]:
+        generator = self.registry.get(job.provider, **job.options)
+        submit, wait = getattr(generator, "submit", None), getattr(generator, "wait", None)
+        artifacts: list[ImageArtifact]
+        if submit is None or wait is None:
+            artifacts = await generator.generate_image(job.prompt, **job.kwargs)
+            return artifacts
+
+        # Provider-side async job: record its ID before waiting, so a restart resumes it
+        if job.checkpoint is not None:
+            artifacts = await wait(job.checkpoint)
+            return artifacts
+        # submit() bypasses the generator's wrappers, so validate here as generate_image would
+        kwargs = validate_request(job.provider, generator.model, job.prompt, job.kwargs)
+        checkpoint = await submit(job.prompt, **kwargs)
+        await asyncio.to_thread(self.queue.save_checkpoint, job.id, self.name, checkpoint)
+        artifacts = await wait(checkpoint, resume=False)
+        return artifacts
+
+
+def _worker_main(
+    path: str, results_dir: str, concurrency: int, lease: float, stop: "multiprocessing.synchronize.Event"
+) -> None:
+    # Deploys send SIGTERM: finish by handing running jobs back instead of dying mid-job
+    def request_stop(_signum: int, _frame: FrameType | None) -> None:
+        stop.set()
+
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, request_stop)
+    queue = JobQueue(path, lease=lease)
+    try:
+        asyncio.run(Worker(queue, results_dir, concurrency=concurrency).run(stop.is_set))
+    finally:
+        queue.close()
+
+
+class WorkerPool:
+    """Worker processes serving one JobQueue database.
+
+    Each process runs a Worker with up to ``concurrency`` jobs in flight. Results are written
+    to ``results_dir`` (next to the database by default). Processes are spawned rather than
+    forked, so they start without the parent's threads, sessions or loaded pipelines.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str],
+        *,
+        workers: int = 2,
+        concurrency: int = 4,
+        results_dir: str | os.PathLike[str] | None = None,
+        lease: float = 300.0,
+    ) -> None:
+        self.path = Path(path)
+        self.workers = workers
+        self.concurrency = concurrency
+        self.results_dir = (
+            Path(results_dir) if results_dir is not None else self.path.with_name(f"{self.path.name}.results")
+        )
+        self.lease = lease
+        self._context = multiprocessing.get_context("spawn")
+        self._stop = self._context.Event()
+        self._processes: list[multiprocessing.process.BaseProcess] = []
+
+    def start(self) -> None:
+        # Create the schema once, before workers race to do it
+        JobQueue(self.path, lease=self.lease).close()
+        self._stop.clear()
+        for _ in range(self.workers - len(self.alive)):
+            process = self._context.Process(
+                target=_worker_main,
+                args=(str(self.path), str(self.results_dir), self.concurrency, self.lease, self._stop),
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+
+    @property
+    def alive(self) -> list[multiprocessing.process.BaseProcess]:
+        self._processes = [p for p in self._processes if p.is_alive()]
+        return self._processes
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Ask workers to hand their jobs back and exit; kill any left after ``timeout``."""
+        self._stop.set()
+        deadline = time.monotonic() + timeout
+        for process in self._processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+        for process in self._processes:
+            if process.is_alive():
+                process.kill()
+                process.join()
+        self._processes.clear()
+
+    def __enter__(self) -> "WorkerPool":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        with contextlib.suppress(Exception):
+            self.stop()
+
+
+__all__ = ["Job", "JobQueue", "JobState", "Worker", "WorkerPool", "persist_artifacts"]
@@ -0,0 +1,44 @@
+"""
+Deferred imports for the heavy SDKs behind some providers (torch, diffusers, google-genai, ...).
+"""
+
+import importlib
+from types import ModuleType
+from typing import Any
+
+
+class LazyModule:
+    """Stands in for a module and imports it on first attribute access.
+
+    Provider modules bind their SDKs through this, so importing a provider and constructing a
+    generator stay cheap and the SDK loads with the first request. Attributes are looked up at
+    use, so ``except sdk.SomeError`` and ``isinstance(x, sdk.Type)`` work unchanged. Modules
+    whose annotations name SDK types import the SDK under ``if TYPE_CHECKING:`` and bind the
+    lazy module in the ``else`` branch, so type checkers still see the real module.
+    """
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+        self._module: ModuleType | None = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def __getattr__(self, attr: str) -> Any:
+        module = self._module
+        if module is None:
+            # import_module holds the import lock, so concurrent first uses import once
+            module = self._module = importlib.import_module(self._name)
+        return getattr(module, attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+__all__ = ["LazyModule", "lazy_import"]
@@ -0,0 +1,446 @@
+"""
+Per-provider parameter schemas: local validation and canonical form of generation kwargs.
+"""
+
+import contextlib
+import functools
+import hashlib
+import json
+import math
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass, field
+from typing import Any
+
+from celeste_core import ImageArtifact, Provider
+from celeste_core.base.image_generator import BaseImageGenerator
+
+from .wrapper import ImageGeneratorWrapper
+
+# Handled by this package rather than sent to the provider, so never validated against a schema
+CLIENT_KWARGS = frozenset({"encoding", "destination", "callback_on_step_end"})
+
+_UNSET: Any = object()
+
+
+class InvalidRequestError(ValueError):
+    """A request failed local validation; nothing was sent to the provider."""
+
+    def __init__(self, provider: Provider, model: str | None, problems: list[str]) -> None:
+        self.provider = provider
+        self.model = model
+        self.problems = problems
+        super().__init__(f"Invalid {provider.value} request for model {model!r}: {'; '.join(problems)}")
+
+
+@dataclass(frozen=True)
+class Param:
+    """Constraints on one kwarg. Values equal to ``default`` are dropped from the canonical form."""
+
+    types: tuple[type, ...]
+    choices: frozenset[Any] | None = None
+    minimum: float | None = None
+    maximum: float | None = None
+    multiple_of: int | None = None
+    default: Any = _UNSET
+    # Accept numeric strings, for providers that send every field form-encoded anyway
+    coerce: bool = False
+    # Match string choices case-insensitively and canonicalize to lower case
+    lower: bool = False
+
+
+def integer(
+    minimum: int | None = None,
+    maximum: int | None = None,
+    *,
+    multiple_of: int | None = None,
+    default: Any = _UNSET,
+    coerce: bool = False,
+) -> Param:
+    return Param((int,), minimum=minimum, maximum=maximum, multiple_of=multiple_of, default=default, coerce=coerce)
+
+
+def number(
+    minimum: float | None = None, maximum: float | None = None, *, default: Any = _UNSET, coerce: bool = False
+) -> Param:
+    return Param((int, float), minimum=minimum, maximum=maximum, default=default, coerce=coerce)
+
+
+def choice(*values: str, default: Any = _UNSET, lower: bool = False) -> Param:
+    return Param((str,), choices=frozenset(values), default=default, lower=lower)
+
+
+def string(max_length: int | None = None) -> Param:
+    return Param((str,), maximum=max_length)
+
+
+@dataclass(frozen=True)
+class ParameterSchema:
+    """The kwargs a provider (or one of its models) accepts.
+
+    Closed schemas reject unknown kwargs, catching typos and unsupported options before any
+    I/O. ``open`` schemas are for models that define their own inputs (diffusers pipelines,
+    Replicate models): known kwargs are checked and unknown ones passed through.
+    """
+
+    params: Mapping[str, Param] = field(default_factory=dict)
+    open: bool = False
+    max_prompt_length: int | None = None
+
+    def extend(self, **params: Param) -> "ParameterSchema":
+        return ParameterSchema({**self.params, **params}, self.open, self.max_prompt_length)
+
+
+# Validators raise ValueError with a message; compiled once per (provider, model)
+_Validator = Callable[[Any], Any]
+
+
+def _coerce_number(accepts_float: bool) -> _Validator:
+    def coerce(value: Any) -> Any:
+        if not isinstance(value, str):
+            return value
+        try:
+            return int(value)
+        except ValueError:
+            if accepts_float:
+                with contextlib.suppress(ValueError):
+                    return float(value)
+        raise ValueError(f"expected a number, got {value!r}")
+
+    return coerce
+
+
+def _check_type(types: tuple[type, ...]) -> _Validator:
+    names = " or ".join(t.__name__ for t in types)
+    # bool is an int subclass, but True is never a valid step count or size
+    rejects_bool = bool not in types
+
+    def check(value: Any) -> Any:
+        if not isinstance(value, types) or (rejects_bool and isinstance(value, bool)):
+            raise ValueError(f"expected {names}, got {type(value).__name__}")
+        if isinstance(value, float) and not math.isfinite(value):
+            raise ValueError(f"expected a finite number, got {value!r}")
+        return value
+
+    return check
+
+
+def _check(predicate: Callable[[Any], bool], message: str) -> _Validator:
+    def check(value: Any) -> Any:
+        if not predicate(value):
+            raise ValueError(message.format(value=value))
+        return value
+
+    return check
+
+
+def _length_checks(param: Param) -> list[_Validator]:
+    if param.maximum is None:
+        return []
+    limit = param.maximum
+    return [_check(lambda v: len(v) <= limit, f"longer than {limit:g} characters")]
+
+
+def _range_checks(param: Param) -> list[_Validator]:
+    checks = []
+    if param.minimum is not None:
+        low = param.minimum
+        checks.append(_check(lambda v: v >= low, f"must be at least {low:g}, got {{value!r}}"))
+    if param.maximum is not None:
+        high = param.maximum
+        checks.append(_check(lambda v: v <= high, f"must be at most {high:g}, got {{value!r}}"))
+    if param.multiple_of is not None:
+        step = param.multiple_of
+        checks.append(_check(lambda v: v % step == 0, f"must be a multiple of {step}, got {{value!r}}"))
+    return checks
+
+
+def _compile_param(param: Param) -> _Validator:
+    """Chain only the checks ``param`` needs, so validating a request is a few calls per kwarg."""
+    is_string = param.types == (str,)
+    steps: list[_Validator] = []
+    if param.coerce and not is_string:
+        steps.append(_coerce_number(float in param.types))
+    steps.append(_check_type(param.types))
+    choices = param.choices
+    if param.lower:
+        steps.append(str.lower)
+        choices = frozenset(c.lower() for c in choices) if choices is not None else None
+    if choices is not None:
+        steps.append(_check(choices.__contains__, f"expected one of {sorted(choices)}, got {{value!r}}"))
+    steps.extend(_length_checks(param) if is_string else _range_checks(param))
+
+    def validate(value: Any) -> Any:
+        for check in steps:
+            value = check(value)
+        return value
+
+    return validate
+
+
+class CompiledSchema:
+    """A ParameterSchema with one validator per kwarg, built once and reused for every request."""
+
+    def __init__(self, provider: Provider, model: str | None, schema: ParameterSchema) -> None:
+        self.provider = provider
+        self.model = model
+        self.schema = schema
+        self._validators = {name: _compile_param(param) for name, param in schema.params.items()}
+        self._defaults = {name: p.default for name, p in schema.params.items() if p.default is not _UNSET}
+
+    def canonicalize(self, prompt: str, kwargs: Mapping[str, Any]) -> dict[str, Any]:
+        """Validated kwargs in canonical form: None and provider defaults dropped, keys sorted.
+
+        Raises InvalidRequestError listing every problem found.
+        """
+        problems = []
+        if not isinstance(prompt, str) or not prompt.strip():
+            problems.append("prompt must be a non-empty string")
+        elif self.schema.max_prompt_length is not None and len(prompt) > self.schema.max_prompt_length:
+            problems.append(f"prompt is longer than {self.schema.max_prompt_length} characters")
+
+        canonical = {}
+        for name in sorted(kwargs):
+            value = kwargs[name]
+            if value is None:
+                continue
+            validator = self._validators.get(name)
+            if validator is not None:
+                try:
+                    value = validator(value)
+                except ValueError as exc:
+                    problems.append(f"{name}: {exc}")
+                    continue
+                if name in self._defaults and value == self._defaults[name]:
+                    continue
+            elif not (self.schema.open or name in CLIENT_KWARGS):
+                problems.append(f"unsupported parameter {name!r}")
+                continue
+            canonical[name] = value
+
+        if problems:
+            raise InvalidRequestError(self.provider, self.model, problems)
+        return canonical
+
+
+_STABILITY = ParameterSchema(
+    {
+        "negative_prompt": string(10000),
+        "aspect_ratio": choice("21:9", "16:9", "3:2", "5:4", "1:1", "4:5", "2:3", "9:16", "9:21", default="1:1"),
+        "seed": integer(0, 4294967294, coerce=True),
+        "output_format": choice("png", "jpeg", "webp", default="png", lower=True),
+        "style_preset": choice(
+            "3d-model",
+            "analog-film",
+            "anime",
+            "cinematic",
+            "comic-book",
+            "digital-art",
+            "enhance",
+            "fantasy-art",
+            "isometric",
+            "line-art",
+            "low-poly",
+            "modeling-compound",
+            "neon-punk",
+            "origami",
+            "photographic",
+            "pixel-art",
+            "tile-texture",
+        ),
+    },
+    max_prompt_length=10000,
+)
+
+# Options every OpenAI image model takes; models without a schema of their own are checked
+# against these and may take others
+_OPENAI = ParameterSchema(
+    {
+        "n": integer(1, 10, default=1),
+        "response_format": choice("url", "b64_json", default="b64_json"),
+        "user": string(),
+    },
+    open=True,
+)
+
+_XAI = ParameterSchema(
+    {
+        "n": integer(1, 10, default=1),
+        "response_format": choice("url", "b64_json", default="b64_json"),
+        "user": string(),
+    }
+)
+
+_LUMA = ParameterSchema(
+    {
+        "aspect_ratio": choice("1:1", "3:4", "4:3", "9:16", "16:9", "9:21", "21:9", default="16:9"),
+        "callback_url": string(),
+        "image_ref": Param((list,)),
+        "style_ref": Param((list,)),
+        "character_ref": Param((dict,)),
+        "modify_image_ref": Param((dict,)),
+    }
+)
+
+# The SDK's GenerateImagesConfig already rejects unknown fields locally; check ranges only
+_GOOGLE = ParameterSchema(
+    {
+        "number_of_images": integer(1, 4),
+        "aspect_ratio": choice("1:1", "3:4", "4:3", "9:16", "16:9"),
+        "negative_prompt": string(),
+        "guidance_scale": number(0),
+        "seed": integer(0, 2**32 - 1),
+        "output_compression_quality": integer(0, 100),
+    },
+    open=True,
+)
+
+# Latent diffusion works on 8x downsampled latents, so pixel sizes must be multiples of 8
+_DIFFUSION = ParameterSchema(
+    {
+        "height": integer(64, multiple_of=8),
+        "width": integer(64, multiple_of=8),
+        "num_inference_steps": integer(1),
+        "guidance_scale": number(0),
+        "negative_prompt": string(),
+        "num_images_per_prompt": integer(1),
+    },
+    open=True,
+)
+
+# Schemas by provider, then by model ID prefix ("" for every other model); longest prefix wins
+SCHEMAS: dict[Provider, dict[str, ParameterSchema]] = {
+    Provider.STABILITYAI: {
+        "": _STABILITY,
+        "sd3": _STABILITY.extend(cfg_scale=number(1, 10, coerce=True), mode=choice("text-to-image")),
+    },
+    Provider.OPENAI: {
+        "": _OPENAI,
+        "dall-e-2": ParameterSchema(
+            {
+                **_OPENAI.params,
+                "size": choice("256x256", "512x512", "1024x1024", default="1024x1024"),
+                "quality": choice("standard", default="standard", lower=True),
+            },
+            max_prompt_length=1000,
+        ),
+        "dall-e-3": ParameterSchema(
+            {
+                **_OPENAI.params,
+                "n": integer(1, 1, default=1),
+                "size": choice("1024x1024", "1792x1024", "1024x1792", default="1024x1024"),
+                "quality": choice("standard", "hd", default="standard", lower=True),
+                "style": choice("vivid", "natural", default="vivid", lower=True),
+            },
+            max_prompt_length=4000,
+        ),
+        "gpt-image": ParameterSchema(
+            {
+                **_OPENAI.params,
+                "size": choice("auto", "1024x1024", "1536x1024", "1024x1536", default="auto"),
+                "quality": choice("auto", "low", "medium", "high", default="auto", lower=True),
+                "background": choice("auto", "transparent", "opaque", default="auto"),
+                "moderation": choice("auto", "low", default="auto"),
+                "output_format": choice("png", "jpeg", "webp", default="png", lower=True),
+                "output_compression": integer(0, 100),
+            },
+            max_prompt_length=32000,
+        ),
+    },
+    Provider.XAI: {"": _XAI},
+    Provider.LUMA: {"": _LUMA},
+    Provider.GOOGLE: {"": _GOOGLE},
+    Provider.LOCAL: {"": _DIFFUSION},
+    Provider.HUGGINGFACE: {"": _DIFFUSION.extend(seed=integer(0))},
+    Provider.REPLICATE: {"": ParameterSchema(open=True)},
+}
+
+
+@functools.cache
+def get_schema(provider: Provider, model: str | None) -> CompiledSchema:
+    """The compiled schema for a provider's model. Unknown providers get an open, empty one."""
+    by_model = SCHEMAS.get(provider, {})
+    prefix = max((p for p in by_model if (model or "").startswith(p)), key=len, default=None)
+    schema = by_model[prefix] if prefix is not None else ParameterSchema(open=True)
+    return CompiledSchema(provider, model, schema)
+
+
+def _provider(provider: Any) -> Provider:
+    return provider if isinstance(provider, Provider) else Provider(getattr(provider, "value", provider))
+
+
+def validate_request(provider: Any, model: str | None, prompt: str, kwargs: Mapping[str, Any]) -> dict[str, Any]:
+    """Canonical kwargs for a request, or InvalidRequestError before anything is sent."""
+    return get_schema(_provider(provider), model).canonicalize(prompt, kwargs)
+
+
+def _canonical_default(value: Any) -> Any:
+    if hasattr(value, "initial_seed"):  # torch.Generator
+        return {"seed": value.initial_seed()}
+    if isinstance(value, bytes | bytearray):
+        return {"sha256": hashlib.sha256(value).hexdigest()}
+    if isinstance(value, set | frozenset):
+        return sorted(value, key=repr)
+    return repr(value)
+
+
+def request_key(provider: Any, model: str | None, prompt: str, kwargs: Mapping[str, Any]) -> str:
+    """Stable hash of a generation request, equal for requests that differ only in form.
+
+    Kwargs are canonicalized through the provider's schema first, so ``{"n": 1}`` and ``{}``,
+    or ``seed="7"`` and ``seed=7`` for form-encoded providers, share a key. Invalid requests
+    are hashed as given; they fail before reaching a cache or upstream call anyway.
+    """
+    # Also covers InvalidRequestError
+    with contextlib.suppress(ValueError):
+        kwargs = validate_request(provider, model, prompt, kwargs)
+    payload = {"provider": getattr(provider, "value", provider), "model": model, "prompt": prompt, "kwargs": kwargs}
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=_canonical_default)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+# Keyword arguments of stream_image that configure the stream rather than the generation
+_STREAM_OPTIONS = ("preview_every",)
+
+
+class ValidatingImageGenerator(ImageGeneratorWrapper):
+    """Validates and canonicalizes kwargs before the wrapped generator sees them.
+
+    Bad requests raise InvalidRequestError without any network call, retry or rate-limit
+    token, and the layers below (cache, single-flight) receive canonical kwargs. This covers
+    ``stream_image`` too, for generators that stream.
+    """
+
+    def __init__(self, generator: BaseImageGenerator) -> None:
+        super().__init__(generator)
+        self.schema = get_schema(_provider(self.provider), self.model)
+
+    def __getattr__(self, name: str) -> Any:
+        attr = super().__getattr__(name)
+        if name == "stream_image":
+            return functools.partial(self._stream_image, attr)
+        return attr
+
+    async def generate_image(self, prompt: str, **kwargs: Any) -> list[ImageArtifact]:
+        artifacts: list[ImageArtifact] = await self.generator.generate_image(
+            prompt, **self.schema.canonicalize(prompt, kwargs)
+        )
+        return artifacts
+
+    def _stream_image(self, stream_image: Callable[..., Any], prompt: str, **kwargs: Any) -> Any:
+        # Validated on the call, not on first iteration; streaming options aren't generation kwargs
+        options = {name: kwargs.pop(name) for name in _STREAM_OPTIONS if name in kwargs}
+        return stream_image(prompt, **options, **self.schema.canonicalize(prompt, kwargs))
+
+
+__all__ = [
+    "CLIENT_KWARGS",
+    "SCHEMAS",
+    "CompiledSchema",
+    "InvalidRequestError",
+    "Param",
+    "ParameterSchema",
+    "ValidatingImageGenerator",
+    "get_schema",
+    "request_key",
+    "validate_request",
+]
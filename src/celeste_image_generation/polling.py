@@ -0,0 +1,179 @@
+"""
+Shared status poller for providers that run generations as asynchronous jobs.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from .ratelimit import TokenBucket
+from .resilience import is_retryable
+
+
+@dataclass
+class JobStatus:
+    done: bool
+    data: dict[str, Any] = field(default_factory=dict)
+    error: str | None = None
+
+
+FetchStatus = Callable[[str], Awaitable[JobStatus]]
+
+
+@dataclass
+class _Job:
+    fetch_status: FetchStatus
+    started: float
+    deadline: float
+    learn: bool
+    waiters: list[asyncio.Future[dict[str, Any]]] = field(default_factory=list)
+
+
+class GenerationPoller:
+    """Polls every pending job from one scheduler task under a global request budget.
+
+    The first status check of a new job is scheduled at the expected completion time, which
+    is learned from observed durations (EWMA). Overdue jobs are re-checked with intervals
+    that grow with their age, bounded by ``min_interval``/``max_interval``.
+
+    Status is fetched with ``fetch_status``, or with the function passed to ``track`` for that
+    job, so one poller (and its learned durations) can serve several client instances.
+    """
+
+    def __init__(
+        self,
+        fetch_status: FetchStatus | None = None,
+        *,
+        requests_per_second: float = 10.0,
+        expected_duration: float = 20.0,
+        min_interval: float = 1.0,
+        max_interval: float = 10.0,
+        timeout: float = 600.0,
+    ) -> None:
+        self.fetch_status = fetch_status
+        self.expected_duration = expected_duration
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.timeout = timeout
+        self.requests_per_second = requests_per_second
+        self._jobs: dict[str, _Job] = {}
+        self._schedule: list[tuple[float, str]] = []
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._checks: set[asyncio.Task[None]] = set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._jobs)
+
+    def track(
+        self, job_id: str, resume: bool = False, *, fetch_status: FetchStatus | None = None
+    ) -> asyncio.Future[dict[str, Any]]:
+        """Return a future resolved with the final status data of ``job_id``.
+
+        Fresh jobs are first checked at their expected completion time and feed the duration
+        estimate. Resumed jobs (e.g. after a restart) are checked immediately.
+        """
+        fetch = fetch_status or self.fetch_status
+        if fetch is None:
+            raise ValueError("GenerationPoller.track needs a fetch_status function")
+        loop = asyncio.get_running_loop()
+        self._ensure_running(loop)
+        future: asyncio.Future[dict[str, Any]] = loop.create_future()
+        job = self._jobs.get(job_id)
+        # A job every earlier waiter abandoned is tracked afresh, with this caller's fetch function
+        if job is None or all(waiter.done() for waiter in job.waiters):
+            now = time.monotonic()
+            job = self._jobs[job_id] = _Job(fetch, started=now, deadline=now + self.timeout, learn=not resume)
+            self._schedule_check(job_id, now if resume else now + self._interval(0.0))
+        job.waiters.append(future)
+        return future
+
+    def _ensure_running(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._wakeup = asyncio.Event()
+            bucket = TokenBucket(self.requests_per_second, max(1.0, self.requests_per_second))
+            # A fresh context, so shared checks aren't timed into whichever request started the
+            # scheduler; each waiter's own trace times its wait for the result instead
+            self._task = loop.create_task(self._run(self._wakeup, bucket), context=contextvars.Context())
+
+    def _interval(self, elapsed: float) -> float:
+        remaining = self.expected_duration - elapsed
+        if remaining > 0:
+            return max(self.min_interval, remaining)
+        return min(self.max_interval, max(self.min_interval, elapsed * 0.2))
+
+    def _schedule_check(self, job_id: str, due: float) -> None:
+        earliest = self._schedule[0][0] if self._schedule else None
+        heapq.heappush(self._schedule, (due, job_id))
+        if self._wakeup is not None and (earliest is None or due < earliest):
+            self._wakeup.set()
+
+    async def _run(self, wakeup: asyncio.Event, bucket: TokenBucket) -> None:
+        while True:
+            delay = self._schedule[0][0] - time.monotonic() if self._schedule else None
+            if delay is None or delay > 0:
+                wakeup.clear()
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(wakeup.wait(), delay)
+                continue
+
+            _, job_id = heapq.heappop(self._schedule)
+            job = self._jobs.get(job_id)
+            if job is None:
+                continue
+            if all(w.done() for w in job.waiters):  # every waiter was cancelled
+                del self._jobs[job_id]
+                continue
+            await bucket.take()
+            check = asyncio.get_running_loop().create_task(self._check(job_id, job))
+            self._checks.add(check)
+            check.add_done_callback(self._checks.discard)
+
+    async def _check(self, job_id: str, job: _Job) -> None:
+        try:
+            status = await job.fetch_status(job_id)
+        except Exception as exc:
+            if self._jobs.get(job_id) is not job:
+                return
+            # A failed status check doesn't mean the job failed: check again later if transient
+            now = time.monotonic()
+            if is_retryable(exc) and now < job.deadline:
+                self._schedule_check(job_id, now + self._interval(now - job.started))
+            else:
+                self._finish(job_id, job, exc)
+            return
+
+        if self._jobs.get(job_id) is not job:
+            # Abandoned and tracked afresh while this check ran; the new entry has its own checks
+            return
+        now = time.monotonic()
+        if status.error is not None:
+            self._finish(job_id, job, RuntimeError(f"Image generation failed: {status.error}"))
+        elif status.done:
+            if job.learn:
+                self.expected_duration = 0.8 * self.expected_duration + 0.2 * (now - job.started)
+            self._finish(job_id, job, status.data)
+        elif now >= job.deadline:
+            self._finish(job_id, job, TimeoutError(f"Image generation timed out after {self.timeout:.0f} seconds"))
+        else:
+            self._schedule_check(job_id, now + self._interval(now - job.started))
+
+    def _finish(self, job_id: str, job: _Job, outcome: dict[str, Any] | Exception) -> None:
+        if self._jobs.get(job_id) is job:
+            del self._jobs[job_id]
+        for waiter in job.waiters:
+            if waiter.done():
+                continue
+            if isinstance(outcome, Exception):
+                waiter.set_exception(outcome)
+            else:
+                waiter.set_result(outcome)
+
+
+__all__ = ["FetchStatus", "GenerationPoller", "JobStatus"]
@@ -1,36 +1,115 @@
-from typing import Any
+from collections import Counter
+from functools import cached_property
+from typing import TYPE_CHECKING, Any
 
 from celeste_core import ImageArtifact
 from celeste_core.base.image_generator import BaseImageGenerator
 from celeste_core.config.settings import settings
 from celeste_core.enums.providers import Provider
-from google import genai
-from google.genai import types
+
+from ..instrumentation import increment, stage
+from ..lazy import lazy_import
+
+if TYPE_CHECKING:
+    import httpx
+    from google import genai
+    from google.genai import errors, types
+else:
+    httpx = lazy_import("httpx")
+    genai = lazy_import("google.genai")
+    errors = lazy_import("google.genai.errors")
+    types = lazy_import("google.genai.types")
+
+IMAGEN_API = "imagen"
+GEMINI_API = "gemini"
+
+# Which endpoint each model is served by, resolved once per process and shared by instances
+_model_apis: dict[str, str] = {}
+
+# How often a model had to fall back from the Imagen endpoint to the Gemini endpoint
+fallback_counts: Counter[str] = Counter()
+
+
+def _known_api(model: str) -> str | None:
+    name = model.rsplit("/", 1)[-1]
+    if name.startswith("imagen"):
+        return IMAGEN_API
+    if name.startswith("gemini"):
+        return GEMINI_API
+    return None
+
+
+# How the API reports a model that exists but doesn't serve generate_images, e.g. "models/x is
+# not found for API version v1beta, or is not supported for predict. Call ListModels to see..."
+_UNSUPPORTED_METHOD = ("not supported for predict", "call listmodels")
+
+
+def _is_unsupported_model(exc: "errors.APIError") -> bool:
+    """Whether the Imagen endpoint rejected the model itself rather than the request.
+
+    Other "not supported" errors (aspect ratio, safety setting, ...) are about the request's
+    parameters and must not reroute the model.
+    """
+    message = str(exc).lower()
+    return exc.code == 404 or any(marker in message for marker in _UNSUPPORTED_METHOD)
 
 
 class GoogleImageGenerator(BaseImageGenerator):
-    def __init__(self, model: str = "imagen-3.0-generate-002", **kwargs: Any) -> None:
+    def __init__(self, model: str = "imagen-3.0-generate-002", *, api_key: str | None = None, **kwargs: Any) -> None:
         super().__init__(model=model, provider=Provider.GOOGLE, **kwargs)
-        self.client = genai.Client(api_key=settings.google.api_key)
+        self.api_key = api_key or settings.google.api_key
+        api = _known_api(model)
+        if api is not None:
+            _model_apis.setdefault(model, api)
+
+    @cached_property
+    def client(self) -> "genai.Client":
+        return genai.Client(api_key=self.api_key)
+
+    @property
+    def transport_errors(self) -> tuple[type[BaseException], ...]:
+        return (httpx.TransportError,)
+
+    async def aclose(self) -> None:
+        if "client" not in self.__dict__:
+            return
+        # Older google-genai releases have no explicit close on the async client
+        aclose = getattr(self.client.aio, "aclose", None)
+        if aclose is not None:
+            await aclose()
 
     async def generate_image(self, prompt: str, **kwargs: Any) -> list[ImageArtifact]:
-        """Generate images using Google's models."""
-        try:
-            return await self._generate_imagen_image(prompt, **kwargs)
-        except Exception:
+        """Generate images using Google's models, routed to the endpoint the model supports."""
+        if _model_apis.get(self.model) == GEMINI_API:
             return await self._generate_gemini_image(prompt, **kwargs)
 
+        try:
+            artifacts = await self._generate_imagen_image(prompt, **kwargs)
+        except errors.ClientError as exc:
+            if not _is_unsupported_model(exc):
+                raise
+            fallback_counts[self.model] += 1
+            increment("api_fallbacks")
+            artifacts = await self._generate_gemini_image(prompt, **kwargs)
+            # Remembered only once the Gemini endpoint has served the model
+            _model_apis[self.model] = GEMINI_API
+            return artifacts
+
+        _model_apis[self.model] = IMAGEN_API
+        return artifacts
+
     async def _generate_imagen_image(self, prompt: str, **kwargs: Any) -> list[ImageArtifact]:
         """Generate images using Google's Imagen API (generate_images)."""
         config = None
         if kwargs:
             config = types.GenerateImagesConfig(**kwargs)
 
-        response = await self.client.aio.models.generate_images(
-            model=self.model,
-            prompt=prompt,
-            config=config,
-        )
+        with stage("generate"):
+            response = await self.client.aio.models.generate_images(
+                model=self.model,
+                prompt=prompt,
+                config=config,
+            )
 
         return [
             ImageArtifact(data=img.image.image_bytes, metadata={"model": self.model, **kwargs})
@@ -40,10 +119,11 @@ class GoogleImageGenerator(BaseImageGenerator):
     async def _generate_gemini_image(self, prompt: str, **kwargs: Any) -> list[ImageArtifact]:
         """Generate images using Google's Gemini API (generate_content)."""
 
-        response = await self.client.aio.models.generate_content(
-            model=self.model,
-            contents=[prompt],
-        )
+        with stage("generate"):
+            response = await self.client.aio.models.generate_content(
+                model=self.model,
+                contents=[prompt],
+            )
 
         artifacts = []
         for candidate in response.candidates:
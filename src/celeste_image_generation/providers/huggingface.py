@@ -1,31 +1,59 @@
-import io
-from typing import Any
+from concurrent.futures import Executor
+from functools import cached_property
+from typing import TYPE_CHECKING, Any
 
 from celeste_core import ImageArtifact
 from celeste_core.base.image_generator import BaseImageGenerator
 from celeste_core.config.settings import settings
 from celeste_core.enums.providers import Provider
-from huggingface_hub import AsyncInferenceClient
+
+from ..encoding import ImageEncoding, encode_images
+from ..instrumentation import stage
+from ..lazy import lazy_import
+
+if TYPE_CHECKING:
+    import huggingface_hub
+else:
+    huggingface_hub = lazy_import("huggingface_hub")
 
 
 class HuggingFaceImageGenerator(BaseImageGenerator):
-    def __init__(self, model: str = "black-forest-labs/FLUX.1-schnell", **kwargs: Any) -> None:
+    def __init__(
+        self,
+        model: str = "black-forest-labs/FLUX.1-schnell",
+        encoding: ImageEncoding | str | None = None,
+        encode_executor: Executor | None = None,
+        **kwargs: Any,
+    ) -> None:
         super().__init__(model=model, provider=Provider.HUGGINGFACE, **kwargs)
-        api_key = settings.huggingface.access_token
-        self.client = AsyncInferenceClient(token=api_key)
+        self.api_key = settings.huggingface.access_token
+        # None keeps the format the image was served in
+        self.encoding = ImageEncoding.parse(encoding) if encoding is not None else None
+        self.encode_executor = encode_executor
+
+    @cached_property
+    def client(self) -> "huggingface_hub.AsyncInferenceClient":
+        return huggingface_hub.AsyncInferenceClient(token=self.api_key)
+
+    async def aclose(self) -> None:
+        if "client" in self.__dict__:
+            await self.client.close()
 
     async def generate_image(self, prompt: str, **kwargs: Any) -> list[ImageArtifact]:
-        img = await self.client.text_to_image(prompt, model=self.model, **kwargs)
-        fmt = getattr(img, "format", None) or "PNG"
-        buf = io.BytesIO()
-        img.save(buf, format=fmt)
+        encoding = kwargs.pop("encoding", self.encoding)
+        with stage("generate"):
+            img = await self.client.text_to_image(prompt, model=self.model, **kwargs)
+        if encoding is None:
+            encoding = ImageEncoding(format=getattr(img, "format", None) or "PNG")
+        with stage("encode"):
+            [(data, format_metadata)] = await encode_images([img], ImageEncoding.parse(encoding), self.encode_executor)
         return [
             ImageArtifact(
-                data=buf.getvalue(),
+                data=data,
                 metadata={
                     "model": self.model,
                     "provider": "huggingface",
-                    "format": fmt,
+                    **format_metadata,
                     **kwargs,
                 },
             )
@@ -1,65 +1,301 @@
-import io
-from typing import Any
+import asyncio
+import multiprocessing
+import threading
+import time
+from collections.abc import AsyncIterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import cached_property
+from typing import TYPE_CHECKING, Any
 
-import torch
 from celeste_core import ImageArtifact
 from celeste_core.base.image_generator import BaseImageGenerator
 from celeste_core.config.settings import settings
 from celeste_core.enums.providers import Provider
-from diffusers import DiffusionPipeline
+
+from ..diffusion import InferenceEngine, PipelinePool, PromptEmbeddingCache, get_embedding_cache, get_pipeline_pool
+from ..diffusion.cpu import (
+    CpuProfile,
+    ProfileReport,
+    apply_cpu_profile,
+    bfloat16_supported,
+    configure_process,
+    peak_memory,
+    reset_peak_memory,
+)
+from ..diffusion.embeddings import cached_prompt_embeddings
+from ..diffusion.progress import GenerationProgress, StepTracker
+from ..encoding import ImageEncoding, encode_images
+from ..instrumentation import stage
+from ..lazy import lazy_import
+
+if TYPE_CHECKING:
+    import diffusers
+    import torch
+else:
+    torch = lazy_import("torch")
+    diffusers = lazy_import("diffusers")
 
 
 class LocalImageGenerator(BaseImageGenerator):
-    """Local image generator using Hugging Face diffusers."""
+    """Local image generator using Hugging Face diffusers.
+
+    Inference runs on a dedicated worker thread and concurrent calls with matching
+    kwargs are micro-batched; see InferenceEngine for ``max_batch_size``/``max_batch_wait``.
+    Loaded pipelines live in a PipelinePool shared by every instance using the same model,
+    dtype, device and CPU profile. Output format is set with ``encoding`` (an ImageEncoding or
+    format name) and can be overridden per call with an ``encoding`` kwarg.
+
+    Prompt embeddings are cached in a PromptEmbeddingCache (shared by default), so repeating
+    a prompt with new seeds or step counts skips the text encoders.
+
+    On CPU, ``cpu_profile`` (a CpuProfile or the name of one in CPU_PROFILES) sets thread
+    counts, channels-last, VAE slicing/tiling, torch.compile and bfloat16; it is ignored on
+    CUDA and MPS. Thread counts and the compile cache are process-wide, so the first profile
+    used in a process sets them; ``measure_cpu_profile`` reports a profile's speedup and peak
+    memory.
+
+    ``stream_image`` is a streaming variant of ``generate_image`` that reports every denoising
+    step and can be abandoned midway.
+    """
 
-    def __init__(self, model: str = "stabilityai/sdxl-turbo", **kwargs: Any) -> None:
+    # Nothing is billed and nothing is left behind by a failed call, so it can be retried whole
+    idempotent = True
+
+    def __init__(
+        self,
+        model: str = "stabilityai/sdxl-turbo",
+        *,
+        max_batch_size: int = 4,
+        max_batch_wait: float = 0.05,
+        pipeline_pool: PipelinePool | None = None,
+        encoding: ImageEncoding | str = "PNG",
+        encode_executor: Executor | None = None,
+        embedding_cache: PromptEmbeddingCache | None = None,
+        cpu_profile: CpuProfile | str | None = None,
+        **kwargs: Any,
+    ) -> None:
         super().__init__(model=model, provider=Provider.LOCAL, **kwargs)
         self.model = model
-        self.pipeline: DiffusionPipeline | None = None
+        # An empty pool is falsy, so test for None
+        self.pipeline_pool = pipeline_pool if pipeline_pool is not None else get_pipeline_pool()
+        self.encoding = ImageEncoding.parse(encoding)
+        self.encode_executor = encode_executor
+        # Empty caches are falsy, so test for None
+        self.embedding_cache = embedding_cache if embedding_cache is not None else get_embedding_cache()
+        self.engine = InferenceEngine(
+            self._load_pipeline,
+            max_batch_size=max_batch_size,
+            max_wait=max_batch_wait,
+            prepare_inputs=self._prepare_inputs,
+            pipeline_lock=self._pipeline_lock,
+        )
+        self.cpu_profile = CpuProfile.parse(cpu_profile) if cpu_profile is not None else None
+        self.profile_report: ProfileReport | None = None
+        self._process_configured = False
+
+    # Device and dtype are detected on first use, so constructing a generator doesn't import torch
 
-        # Detect device: CUDA > MPS > CPU
+    @cached_property
+    def device(self) -> str:
+        """CUDA > MPS > CPU."""
         if torch.cuda.is_available():
-            self.device = "cuda"
-            self.dtype = torch.float16
-        elif torch.backends.mps.is_available():
-            self.device = "mps"
-            self.dtype = torch.float32  # float32 is more stable on MPS
-        else:
-            self.device = "cpu"
-            self.dtype = torch.float32
-
-    def _load_pipeline(self) -> None:
-        """Lazy load the pipeline to save memory until first use."""
-        if self.pipeline is None:
-            self.pipeline = DiffusionPipeline.from_pretrained(
-                self.model,
-                torch_dtype=self.dtype,
-                token=settings.huggingface.access_token,
-                use_safetensors=True,
-            ).to(self.device)
-
-            # Enable memory optimizations
-            if self.device == "cuda":
-                self.pipeline.enable_model_cpu_offload()
-            elif self.device == "mps":
-                # Recommended for Apple Silicon with < 64GB RAM
-                self.pipeline.enable_attention_slicing()
+            return "cuda"
+        if torch.backends.mps.is_available():
+            return "mps"
+        return "cpu"
 
-    async def generate_image(self, prompt: str, **kwargs: Any) -> list[ImageArtifact]:
+    @cached_property
+    def active_cpu_profile(self) -> CpuProfile | None:
+        """The CPU profile, if inference actually runs on the CPU."""
+        return self.cpu_profile if self.device == "cpu" else None
+
+    @cached_property
+    def dtype(self) -> "torch.dtype":
+        if self.device == "cuda":
+            return torch.float16
+        profile = self.active_cpu_profile
+        if profile is not None and profile.bfloat16 and bfloat16_supported():
+            return torch.bfloat16
+        # float32 is more stable on MPS
+        return torch.float32
+
+    @property
+    def pipeline_key(self) -> "tuple[str, torch.dtype, str, CpuProfile | None]":
+        return (self.model, self.dtype, self.device, self.active_cpu_profile)
+
+    @property
+    def pipeline(self) -> "diffusers.DiffusionPipeline | None":
+        """The loaded pipeline, or None if it has not been loaded or was evicted from the pool."""
+        return self.pipeline_pool.peek(self.pipeline_key)
+
+    def _create_pipeline(self) -> "diffusers.DiffusionPipeline":
+        pipeline = diffusers.DiffusionPipeline.from_pretrained(
+            self.model,
+            torch_dtype=self.dtype,
+            token=settings.huggingface.access_token,
+            use_safetensors=True,
+        ).to(self.device)
+
+        # Enable memory optimizations
+        if self.device == "cuda":
+            pipeline.enable_model_cpu_offload()
+        elif self.device == "mps":
+            # Recommended for Apple Silicon with < 64GB RAM
+            pipeline.enable_attention_slicing()
+        elif self.active_cpu_profile is not None:
+            apply_cpu_profile(pipeline, self.active_cpu_profile)
+        return pipeline
+
+    def _load_pipeline(self) -> "diffusers.DiffusionPipeline":
+        """Lazy load the pipeline through the shared pool. Runs on the engine thread."""
+        # Thread counts apply to the calling thread's parallel regions, so set them here
+        if self.active_cpu_profile is not None and not self._process_configured:
+            configure_process(self.active_cpu_profile)
+            self._process_configured = True
+        return self.pipeline_pool.get(self.pipeline_key, self._create_pipeline)
+
+    def _pipeline_lock(self) -> threading.Lock:
+        return self.pipeline_pool.lock(self.pipeline_key)
+
+    def _prepare_inputs(
+        self, pipeline: "diffusers.DiffusionPipeline", prompts: list[str], kwargs: dict[str, Any]
+    ) -> dict[str, Any] | None:
+        """Swap prompts for cached embeddings. Runs on the engine thread."""
+        return cached_prompt_embeddings(pipeline, prompts, kwargs, self.embedding_cache, self.pipeline_key)
+
+    async def preload(self, warmup: bool = True) -> None:
+        """Load the weights now and run a tiny dummy inference so the first request is fast.
+
+        With a compiling CPU profile the warmup runs at the profile's warmup size instead,
+        so the graph for that resolution is compiled (or read from the cache) ahead of traffic.
+        """
+        await self.engine.call(self._preload, warmup)
+
+    def _preload(self, warmup: bool) -> None:
         self._load_pipeline()
-        if self.pipeline is None:
-            raise RuntimeError("Failed to load pipeline")
-        with torch.no_grad():
-            images = self.pipeline(prompt, **kwargs).images
+        profile = self.active_cpu_profile
+        warmup_kwargs = profile.warmup_kwargs if profile is not None and profile.compile else None
+        self.pipeline_pool.preload(self.pipeline_key, self._create_pipeline, warmup, warmup_kwargs)
+
+    async def measure_cpu_profile(
+        self, prompt: str = "a photograph of an astronaut riding a horse", *, repeats: int = 3, **kwargs: Any
+    ) -> ProfileReport:
+        """Time this generator's CPU profile against an untuned float32 pipeline.
+
+        Each side loads its own pipeline in a fresh spawned process, so neither inherits the
+        other's thread settings or memory: one untimed request (loading, compiling, first-call
+        kernel setup), then ``repeats`` timed ones with ``kwargs``, which must be picklable.
+        Peak memory is that process's peak resident size while timed (Linux only). The report
+        is also kept in ``profile_report``.
+        """
+        profile = self.active_cpu_profile
+        if profile is None:
+            raise ValueError("measure_cpu_profile needs a cpu_profile and a CPU device")
+
+        loop = asyncio.get_running_loop()
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=1, mp_context=context, max_tasks_per_child=1) as executor:
+            baseline_seconds, baseline_peak = await loop.run_in_executor(
+                executor, _measure_in_process, self.model, None, prompt, repeats, kwargs
+            )
+            seconds, peak = await loop.run_in_executor(
+                executor, _measure_in_process, self.model, profile, prompt, repeats, kwargs
+            )
+
+        self.profile_report = ProfileReport(profile.name, seconds, baseline_seconds, peak, baseline_peak)
+        return self.profile_report
+
+    async def aclose(self) -> None:
+        """Stop the inference thread. The pipeline stays pooled for other instances."""
+        await self.engine.aclose()
+
+    async def generate_image(self, prompt: str, **kwargs: Any) -> list[ImageArtifact]:
+        return await self._generate(prompt, kwargs)
+
+    async def stream_image(
+        self, prompt: str, *, preview_every: int = 0, **kwargs: Any
+    ) -> AsyncIterator[GenerationProgress]:
+        """Generate like ``generate_image``, yielding a GenerationProgress after every step.
+
+        Every ``preview_every`` steps the event includes a low-resolution preview. The last
+        event carries the artifacts. Closing the iterator early, or cancelling the task that
+        consumes it, stops the pipeline at its next step.
+        """
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue[GenerationProgress | None] = asyncio.Queue()
+
+        def emit(event: GenerationProgress) -> None:
+            # Called on the inference thread
+            loop.call_soon_threadsafe(events.put_nowait, event)
+
+        tracker = StepTracker(
+            emit,
+            preview_every=preview_every,
+            total_steps=kwargs.get("num_inference_steps"),
+        )
+        # A step callback is per request, so the engine runs this prompt outside any batch
+        task = asyncio.ensure_future(self._generate(prompt, kwargs, callback_on_step_end=tracker))
+        # Step events are queued before the inference result reaches the loop, so this comes last
+        task.add_done_callback(lambda _: events.put_nowait(None))
+        try:
+            last = None
+            while (event := await events.get()) is not None:
+                last = event
+                yield event
+            artifacts = task.result()
+            step = (last.total_steps or last.step) if last is not None else 0
+            elapsed = time.perf_counter() - tracker.started
+            yield GenerationProgress(step, step, elapsed, 0.0, artifacts=artifacts)
+        finally:
+            tracker.cancel()
+            task.cancel()
+
+    async def _generate(self, prompt: str, kwargs: dict[str, Any], **call_kwargs: Any) -> list[ImageArtifact]:
+        kwargs = dict(kwargs)
+        encoding = ImageEncoding.parse(kwargs.pop("encoding", self.encoding))
+        images = await self.engine.run(prompt, **kwargs, **call_kwargs)
+        with stage("encode"):
+            encoded = await encode_images(images, encoding, self.encode_executor)
+
+        profile = self.active_cpu_profile
+        profile_metadata = {"cpu_profile": profile.name} if profile is not None else {}
 
         return [
             ImageArtifact(
-                data=(
-                    img_bytes := io.BytesIO(),
-                    img.save(img_bytes, format="PNG"),
-                    img_bytes.getvalue(),
-                )[2],
-                metadata={"model": self.model, "device": self.device, **kwargs},
+                data=data,
+                metadata={"model": self.model, "device": self.device, **profile_metadata, **format_metadata, **kwargs},
             )
-            for img in images
+            for data, format_metadata in encoded
         ]
+
+
+def _measure_in_process(
+    model: str, profile: CpuProfile | None, prompt: str, repeats: int, kwargs: dict[str, Any]
+) -> tuple[float, int | None]:
+    """Entry point of a measuring process: time a fresh generator with ``profile``."""
+
+    async def measure() -> tuple[float, int | None]:
+        generator = LocalImageGenerator(model, pipeline_pool=PipelinePool(), cpu_profile=profile)
+        try:
+            return await _time_generations(generator, prompt, repeats, kwargs)
+        finally:
+            await generator.aclose()
+
+    return asyncio.run(measure())
+
+
+async def _time_generations(
+    generator: LocalImageGenerator, prompt: str, repeats: int, kwargs: dict[str, Any]
+) -> tuple[float, int | None]:
+    """Mean seconds per generation after one untimed request, and peak memory while timed."""
+
+    def seeded() -> dict[str, Any]:
+        # A per-request generator also keeps these runs out of micro-batches and their wait
+        return {"generator": torch.Generator().manual_seed(0), **kwargs}
+
+    await generator.engine.run(prompt, **seeded())
+    reset_peak_memory()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        await generator.engine.run(prompt, **seeded())
+    return (time.perf_counter() - start) / repeats, peak_memory()
@@ -1,71 +1,125 @@
-import asyncio
 from typing import Any
 
-import aiohttp
 from celeste_core import ImageArtifact
 from celeste_core.base.image_generator import BaseImageGenerator
 from celeste_core.config.settings import settings
 from celeste_core.enums.providers import Provider
 
+from ..downloads import store, stream_url
+from ..instrumentation import stage
+from ..polling import GenerationPoller, JobStatus
+from ..resilience import post_until_accepted, retry_step
+from ..sessions import SessionPool, get_session_pool
+from ..storage import ArtifactStore
+
+# One poller per account and endpoint, shared by every generator instance using it. Each
+# instance passes its own fetch function to track(), so the poller holds no generator
+_pollers: dict[tuple[str, str], GenerationPoller] = {}
+
+
+def _shared_poller(base_url: str, api_key: str) -> GenerationPoller:
+    poller = _pollers.get((base_url, api_key))
+    if poller is None:
+        poller = _pollers[base_url, api_key] = GenerationPoller()
+    return poller
+
 
 class LumaImageGenerator(BaseImageGenerator):
-    """Luma Labs Dream Machine image generator."""
+    """Luma Labs Dream Machine image generator.
+
+    Generations are submitted, then awaited through a shared GenerationPoller. ``submit`` and
+    ``wait`` can be used separately to persist a generation ID and resume after a restart.
+    Submissions the API turns away (e.g. rate limited) and transient polling and download errors
+    are retried here, so whole calls (which would submit and pay for a new generation) are not
+    retried by default.
+    """
 
-    def __init__(self, model: str = "photon-1", **kwargs: Any) -> None:
+    def __init__(
+        self,
+        model: str = "photon-1",
+        session_pool: SessionPool | None = None,
+        poller: GenerationPoller | None = None,
+        *,
+        base_url: str = "https://api.lumalabs.ai/dream-machine/v1",
+        api_key: str | None = None,
+        artifact_store: ArtifactStore | None = None,
+        **kwargs: Any,
+    ) -> None:
         super().__init__(model=model, provider=Provider.LUMA, **kwargs)
-        self.api_key = settings.luma.api_key
-        self.base_url = "https://api.lumalabs.ai/dream-machine/v1"
+        self.api_key = api_key or settings.luma.api_key
+        self.base_url = base_url
+        self.session_pool = session_pool or get_session_pool()
+        # Optional spill-to-disk storage for large images
+        self.artifact_store = artifact_store
+        self.poller = poller or _shared_poller(self.base_url, self.api_key)
 
-    async def generate_image(self, prompt: str, **kwargs: Any) -> list[ImageArtifact]:
-        """Generate images using Luma's Dream Machine API."""
-        headers = {
+    @property
+    def headers(self) -> dict[str, str]:
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
         }
+
+    async def generate_image(self, prompt: str, **kwargs: Any) -> list[ImageArtifact]:
+        """Generate images using Luma's Dream Machine API."""
+        with stage("submit"):
+            generation_id = await self.submit(prompt, **kwargs)
+        with stage("polling"):
+            status_data = await self.poller.track(generation_id, fetch_status=self._fetch_status)
+        return await self._download(generation_id, status_data, kwargs)
+
+    async def submit(self, prompt: str, **kwargs: Any) -> str:
+        """Create a generation and return its ID without waiting for it to finish."""
         data = {"prompt": prompt, "model": self.model, **kwargs}
+        url = f"{self.base_url}/generations/image"
+        async with await post_until_accepted(self.session_pool, url, headers=self.headers, json=data) as response:
+            generation_id: str = (await response.json())["id"]
+            return generation_id
+
+    async def wait(self, generation_id: str, *, resume: bool = True) -> list[ImageArtifact]:
+        """Wait for a previously submitted generation, e.g. one persisted before a restart.
+
+        Pass ``resume=False`` for a generation that was just submitted, so polling starts at
+        its expected completion time.
+        """
+        with stage("polling"):
+            status_data = await self.poller.track(generation_id, resume=resume, fetch_status=self._fetch_status)
+        return await self._download(generation_id, status_data, {})
+
+    async def _fetch_status(self, generation_id: str) -> JobStatus:
+        session = self.session_pool.session()
+        async with session.get(f"{self.base_url}/generations/{generation_id}", headers=self.headers) as response:
+            response.raise_for_status()
+            status_data = await response.json()
+
+        state = status_data.get("state")
+        if state == "failed":
+            return JobStatus(done=True, data=status_data, error=status_data.get("failure_reason", "Unknown error"))
+        return JobStatus(done=state == "completed", data=status_data)
+
+    async def _download(
+        self, generation_id: str, status_data: dict[str, Any], kwargs: dict[str, Any]
+    ) -> list[ImageArtifact]:
+        image_url = status_data.get("assets", {}).get("image")
+        if not image_url:
+            raise ValueError("No image URL in completed generation")
+
+        # The generation is paid for by now: retry its download rather than the whole call
+        with stage("download"):
+            image_bytes, extra = await retry_step(
+                lambda: store(stream_url(self.session_pool, image_url), None, 0, self.artifact_store)
+            )
 
-        async with aiohttp.ClientSession() as session:
-            # Create generation
-            async with session.post(f"{self.base_url}/generations/image", headers=headers, json=data) as response:
-                response.raise_for_status()
-                generation_id = (await response.json())["id"]
-
-            # Poll for completion with exponential backoff
-            max_attempts = 60
-            base_delay = 2
-
-            for attempt in range(max_attempts):
-                delay = min(base_delay * (2 ** min(attempt // 5, 4)), 10)
-                await asyncio.sleep(delay)
-                async with session.get(f"{self.base_url}/generations/{generation_id}", headers=headers) as response:
-                    response.raise_for_status()
-
-                    status_data = await response.json()
-                    state = status_data.get("state")
-
-                    if state == "completed":
-                        image_url = status_data.get("assets", {}).get("image")
-                        if not image_url:
-                            raise ValueError("No image URL in completed generation")
-
-                        async with session.get(image_url) as img_response:
-                            img_response.raise_for_status()
-
-                            return [
-                                ImageArtifact(
-                                    data=await img_response.read(),
-                                    metadata={
-                                        "model": self.model,
-                                        "generation_id": generation_id,
-                                        "created_at": status_data.get("created_at"),
-                                        "provider": "luma",
-                                        **kwargs,
-                                    },
-                                )
-                            ]
-
-                    elif state == "failed":
-                        failure_reason = status_data.get("failure_reason", "Unknown error")
-                        raise RuntimeError(f"Image generation failed: {failure_reason}")
-
-            raise TimeoutError("Image generation timed out after 5 minutes")
+        return [
+            ImageArtifact(
+                data=image_bytes,
+                metadata={
+                    "model": self.model,
+                    "generation_id": generation_id,
+                    "created_at": status_data.get("created_at"),
+                    "provider": "luma",
+                    **extra,
+                    **kwargs,
+                },
+            )
+        ]
@@ -1,37 +1,97 @@
 import base64
-from typing import Any
+from functools import cached_property, partial
+from typing import TYPE_CHECKING, Any
 
-import aiohttp
 from celeste_core import ImageArtifact
 from celeste_core.base.image_generator import BaseImageGenerator
 from celeste_core.config.settings import settings
 from celeste_core.enums.providers import Provider
-from openai import AsyncOpenAI
+
+from ..downloads import DEFAULT_MAX_CONCURRENT_DOWNLOADS, Destination, gather_bounded, store, stream_url
+from ..instrumentation import stage
+from ..lazy import lazy_import
+from ..resilience import retry_step, was_rejected
+from ..sessions import SessionPool, get_session_pool
+from ..storage import ArtifactStore, decode_b64
+
+if TYPE_CHECKING:
+    import openai
+else:
+    openai = lazy_import("openai")
 
 
 class OpenAIImageGenerator(BaseImageGenerator):
-    """OpenAI image generator using DALL-E models."""
+    """OpenAI image generator using DALL-E models.
 
-    def __init__(self, model: str = "dall-e-3", **kwargs: Any) -> None:
+    URL-mode images are downloaded concurrently, up to ``max_concurrent_downloads`` at a time.
+    A per-call ``destination`` callable (image index -> path or binary file) streams each
+    image there instead of returning its bytes.
+    """
+
+    def __init__(
+        self,
+        model: str = "dall-e-3",
+        session_pool: SessionPool | None = None,
+        *,
+        base_url: str | None = None,
+        api_key: str | None = None,
+        max_concurrent_downloads: int = DEFAULT_MAX_CONCURRENT_DOWNLOADS,
+        artifact_store: ArtifactStore | None = None,
+        **kwargs: Any,
+    ) -> None:
         super().__init__(model=model, provider=Provider.OPENAI, **kwargs)
-        self.client = AsyncOpenAI(api_key=settings.openai.api_key)
+        self.max_concurrent_downloads = max_concurrent_downloads
+        self.api_key = api_key or settings.openai.api_key
+        self.base_url = base_url
+        self.session_pool = session_pool or get_session_pool()
+        # Optional spill-to-disk storage for large images
+        self.artifact_store = artifact_store
+
+    @cached_property
+    def client(self) -> "openai.AsyncOpenAI":
+        # The SDK's own retries would repeat accepted (billed) calls; see generate_image
+        return openai.AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+
+    @property
+    def transport_errors(self) -> tuple[type[BaseException], ...]:
+        return (openai.APIConnectionError,)
+
+    async def aclose(self) -> None:
+        if "client" in self.__dict__:
+            await self.client.close()
 
     async def generate_image(self, prompt: str, **kwargs: Any) -> list[ImageArtifact]:
         """
         Generate images using OpenAI's image generation API.
         """
+        destination: Destination | None = kwargs.pop("destination", None)
         kwargs.setdefault("response_format", "b64_json")
-        response = await self.client.images.generate(model=self.model, prompt=prompt, **kwargs)
+        with stage("generate"):
+            # Retried only while the API turns the request away (rate limited) unprocessed
+            response = await retry_step(
+                lambda: self.client.images.generate(model=self.model, prompt=prompt, **kwargs),
+                retryable=was_rejected,
+            )
+
+        async def retrieve(index: int, img_data: Any) -> tuple[bytes | None, dict[str, Any]]:
+            if getattr(img_data, "b64_json", None):
+                with stage("decode"):
+                    if destination is None:
+                        return await decode_b64(img_data.b64_json, self.artifact_store)
+                    image_bytes = base64.b64decode(img_data.b64_json)
+                return await store(image_bytes, destination, index)
+            source = stream_url(self.session_pool, img_data.url)
+            return await store(source, destination, index, self.artifact_store)
+
+        with stage("download"):
+            retrieved = await gather_bounded(
+                [partial(retrieve, i, img_data) for i, img_data in enumerate(response.data)],
+                self.max_concurrent_downloads,
+            )
 
         images: list[ImageArtifact] = []
-        for img_data in response.data:
-            if hasattr(img_data, "b64_json") and img_data.b64_json:
-                image_bytes = base64.b64decode(img_data.b64_json)
-            else:
-                async with aiohttp.ClientSession() as session, session.get(img_data.url) as resp:
-                    image_bytes = await resp.read()
-
-            metadata = {"model": self.model, **kwargs}
+        for img_data, (image_bytes, extra) in zip(response.data, retrieved, strict=True):
+            metadata = {"model": self.model, **extra, **kwargs}
             if img_data.revised_prompt:
                 metadata["revised_prompt"] = img_data.revised_prompt
 
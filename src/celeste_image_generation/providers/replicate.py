@@ -1,35 +1,82 @@
-from typing import Any
+from functools import cached_property, partial
+from typing import TYPE_CHECKING, Any
 
-import replicate
 from celeste_core import ImageArtifact, Provider
 from celeste_core.base.image_generator import BaseImageGenerator
 from celeste_core.config.settings import settings
 
+from ..downloads import DEFAULT_MAX_CONCURRENT_DOWNLOADS, Destination, gather_bounded, store, stream_url
+from ..instrumentation import stage
+from ..lazy import lazy_import
+from ..sessions import SessionPool, get_session_pool
+from ..storage import ArtifactStore
+
+if TYPE_CHECKING:
+    import httpx
+    import replicate
+else:
+    httpx = lazy_import("httpx")
+    replicate = lazy_import("replicate")
+
 
 class ReplicateImageGenerator(BaseImageGenerator):
-    """Replicate image generator for various models."""
+    """Replicate image generator for various models.
+
+    Outputs are streamed concurrently, up to ``max_concurrent_downloads`` at a time. A per-call
+    ``destination`` callable (output index -> path or binary file) writes each output there
+    instead of returning its bytes.
+    """
 
-    def __init__(self, model: str = "stability-ai/sdxl", **kwargs: Any) -> None:
+    def __init__(
+        self,
+        model: str = "stability-ai/sdxl",
+        session_pool: SessionPool | None = None,
+        *,
+        max_concurrent_downloads: int = DEFAULT_MAX_CONCURRENT_DOWNLOADS,
+        artifact_store: ArtifactStore | None = None,
+        **kwargs: Any,
+    ) -> None:
         super().__init__(model=model, provider=Provider.REPLICATE, **kwargs)
-        self.client = replicate.Client(api_token=settings.replicate.api_token)
+        self.api_token = settings.replicate.api_token
+        # Used for outputs returned as plain URLs rather than FileOutput objects
+        self.session_pool = session_pool or get_session_pool()
+        self.max_concurrent_downloads = max_concurrent_downloads
+        # Optional spill-to-disk storage for large images
+        self.artifact_store = artifact_store
+
+    @cached_property
+    def client(self) -> "replicate.Client":
+        return replicate.Client(api_token=self.api_token)
+
+    @property
+    def transport_errors(self) -> tuple[type[BaseException], ...]:
+        return (httpx.TransportError,)
 
     async def generate_image(self, prompt: str, **kwargs: Any) -> list[ImageArtifact]:
         """Generate images using Replicate's official SDK."""
+        destination: Destination | None = kwargs.pop("destination", None)
         input_data = {"prompt": prompt, **kwargs}
 
         # Use client's async run method
-        outputs = await self.client.async_run(self.model, input=input_data)
-
-        images: list[ImageArtifact] = []
+        with stage("generate"):
+            outputs = await self.client.async_run(self.model, input=input_data)
 
         # Handle both single output and list of outputs
         if not isinstance(outputs, list):
             outputs = [outputs]
 
-        for output in outputs:
-            # Read binary data from FileOutput object
-            image_bytes = output.read()
+        async def retrieve(index: int, output: Any) -> tuple[bytes | None, dict[str, Any]]:
+            # FileOutput streams asynchronously over the SDK's client; older models return URLs
+            source = output if hasattr(output, "__aiter__") else stream_url(self.session_pool, str(output))
+            return await store(source, destination, index, self.artifact_store)
 
-            images.append(ImageArtifact(data=image_bytes, metadata={"model": self.model, **kwargs}))
+        with stage("download"):
+            retrieved = await gather_bounded(
+                [partial(retrieve, i, output) for i, output in enumerate(outputs)],
+                self.max_concurrent_downloads,
+            )
 
-        return images
+        return [
+            ImageArtifact(data=image_bytes, metadata={"model": self.model, **extra, **kwargs})
+            for image_bytes, extra in retrieved
+        ]
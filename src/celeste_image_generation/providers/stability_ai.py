@@ -1,4 +1,4 @@
-import base64
+import json
 from typing import Any
 
 import aiohttp
@@ -7,50 +7,73 @@ from celeste_core.base.image_generator import BaseImageGenerator
 from celeste_core.config.settings import settings
 from celeste_core.enums.providers import Provider
 
+from ..downloads import DEFAULT_CHUNK_SIZE, store
+from ..instrumentation import record_size, stage
+from ..resilience import post_until_accepted
+from ..sessions import SessionPool, get_session_pool
+from ..storage import ArtifactStore, decode_b64
+
 
 class StabilityAIImageGenerator(BaseImageGenerator):
-    def __init__(self, model: str = "core", **kwargs: Any) -> None:
+    def __init__(
+        self,
+        model: str = "core",
+        session_pool: SessionPool | None = None,
+        *,
+        base_url: str = "https://api.stability.ai/v2beta",
+        api_key: str | None = None,
+        artifact_store: ArtifactStore | None = None,
+        **kwargs: Any,
+    ) -> None:
         super().__init__(model=model, provider=Provider.STABILITYAI, **kwargs)
-        self.api_key = settings.stability.api_key
+        self.api_key = api_key or settings.stability.api_key
+        self.base_url = base_url
         self.is_raw = self.model in ["core", "ultra"]
+        self.session_pool = session_pool or get_session_pool()
+        # Optional spill-to-disk storage for large images
+        self.artifact_store = artifact_store
 
     async def generate_image(self, prompt: str, **kwargs: Any) -> list[ImageArtifact]:
         """Generate images using Stability AI's v2 API."""
-        endpoint = f"https://api.stability.ai/v2beta/stable-image/generate/{self.model}"
+        endpoint = f"{self.base_url}/stable-image/generate/{self.model}"
 
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Accept": "image/*" if self.is_raw else "application/json",
         }
 
-        data = aiohttp.FormData()
-        data.add_field("none", "", filename="", content_type="application/octet-stream")
-        data.add_field("prompt", prompt)
-        data.add_field("model", self.model)
-
-        # Add all kwargs as form fields
-        for key, value in kwargs.items():
-            data.add_field(key, str(value))
-
-        async with aiohttp.ClientSession() as session, session.post(endpoint, headers=headers, data=data) as response:
-            response.raise_for_status()
-
-            if self.is_raw:
-                return [
-                    ImageArtifact(
-                        data=await response.read(),
-                        metadata={"model": self.model, **kwargs},
-                    )
-                ]
-
-            response_data = await response.json()
-            return [
-                ImageArtifact(
-                    data=base64.b64decode(response_data["image"]),
-                    metadata={
-                        "model": self.model,
-                        "seed": response_data.get("seed"),
-                        **kwargs,
-                    },
-                )
-            ]
+        def form() -> aiohttp.FormData:
+            data = aiohttp.FormData()
+            data.add_field("none", "", filename="", content_type="application/octet-stream")
+            data.add_field("prompt", prompt)
+            data.add_field("model", self.model)
+
+            # Add all kwargs as form fields
+            for key, value in kwargs.items():
+                data.add_field(key, str(value))
+            return data
+
+        with stage("generate"):
+            async with await post_until_accepted(self.session_pool, endpoint, headers=headers, data=form) as response:
+                if self.is_raw:
+                    chunks = response.content.iter_chunked(DEFAULT_CHUNK_SIZE)
+                    image_bytes, extra = await store(chunks, None, 0, self.artifact_store)
+                    return [ImageArtifact(data=image_bytes, metadata={"model": self.model, **extra, **kwargs})]
+                body = await response.read()
+        record_size("download", len(body))
+
+        response_data = json.loads(body)
+        del body
+        with stage("decode"):
+            image_bytes, extra = await decode_b64(response_data.pop("image"), self.artifact_store)
+        return [
+            ImageArtifact(
+                data=image_bytes,
+                metadata={
+                    "model": self.model,
+                    "seed": response_data.get("seed"),
+                    **extra,
+                    **kwargs,
+                },
+            )
+        ]
@@ -1,20 +1,36 @@
-import base64
+import json
 from typing import Any
 
-import aiohttp
 from celeste_core import ImageArtifact
 from celeste_core.base.image_generator import BaseImageGenerator
 from celeste_core.config.settings import settings
 from celeste_core.enums.providers import Provider
 
+from ..instrumentation import record_size, stage
+from ..resilience import post_until_accepted
+from ..sessions import SessionPool, get_session_pool
+from ..storage import ArtifactStore, decode_b64
+
 
 class XAIImageGenerator(BaseImageGenerator):
     """xAI image generator using Grok's image API."""
 
-    def __init__(self, model: str = "grok-2-image", **kwargs: Any) -> None:
+    def __init__(
+        self,
+        model: str = "grok-2-image",
+        session_pool: SessionPool | None = None,
+        *,
+        base_url: str = "https://api.x.ai/v1",
+        api_key: str | None = None,
+        artifact_store: ArtifactStore | None = None,
+        **kwargs: Any,
+    ) -> None:
         super().__init__(model=model, provider=Provider.XAI, **kwargs)
-        self.api_key = settings.xai.api_key
-        self.base_url = "https://api.x.ai/v1"
+        self.api_key = api_key or settings.xai.api_key
+        self.base_url = base_url
+        self.session_pool = session_pool or get_session_pool()
+        # Optional spill-to-disk storage for large images
+        self.artifact_store = artifact_store
 
     async def generate_image(self, prompt: str, **kwargs: Any) -> list[ImageArtifact]:
         """Generate images using xAI's image generation endpoint."""
@@ -30,30 +46,34 @@ class XAIImageGenerator(BaseImageGenerator):
             **kwargs,
         }
 
-        async with (
-            aiohttp.ClientSession() as session,
-            session.post(
+        with stage("generate"):
+            async with await post_until_accepted(
+                self.session_pool,
                 f"{self.base_url}/images/generations",
                 json=data,
                 headers=headers,
-            ) as response,
-        ):
-            response.raise_for_status()
+            ) as response:
+                body = await response.read()
+        record_size("download", len(body))
 
-            result = await response.json()
-            images: list[ImageArtifact] = []
+        result = json.loads(body)
+        del body
+        images: list[ImageArtifact] = []
 
-            for img_data in result.get("data", []):
-                image_bytes = base64.b64decode(img_data["b64_json"])
+        for img_data in result.get("data", []):
+            with stage("decode"):
+                # pop, so each base64 string can be freed as soon as it is decoded
+                image_bytes, extra = await decode_b64(img_data.pop("b64_json"), self.artifact_store)
 
-                metadata = {
-                    "model": self.model,
-                    "provider": "xai",
-                    **kwargs,
-                }
-                if "revised_prompt" in img_data:
-                    metadata["revised_prompt"] = img_data["revised_prompt"]
+            metadata = {
+                "model": self.model,
+                "provider": "xai",
+                **extra,
+                **kwargs,
+            }
+            if "revised_prompt" in img_data:
+                metadata["revised_prompt"] = img_data["revised_prompt"]
 
-                images.append(ImageArtifact(data=image_bytes, metadata=metadata))
+            images.append(ImageArtifact(data=image_bytes, metadata=metadata))
 
-            return images
+        return images
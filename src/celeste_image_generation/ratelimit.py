@@ -0,0 +1,125 @@
+"""
+Per-provider request rate and concurrency limits.
+"""
+
+import asyncio
+import time
+import weakref
+from dataclasses import dataclass
+from types import TracebackType
+
+from celeste_core import Provider
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    requests_per_minute: float | None = None
+    max_concurrency: int | None = None
+    burst: int | None = None
+
+
+# Conservative defaults sized for entry-level API tiers; override with set_rate_limit()
+DEFAULT_RATE_LIMITS: dict[Provider, RateLimit] = {
+    Provider.GOOGLE: RateLimit(requests_per_minute=60, max_concurrency=8),
+    Provider.STABILITYAI: RateLimit(requests_per_minute=600, max_concurrency=16),
+    Provider.LOCAL: RateLimit(max_concurrency=8),
+    Provider.OPENAI: RateLimit(requests_per_minute=50, max_concurrency=8),
+    Provider.HUGGINGFACE: RateLimit(requests_per_minute=60, max_concurrency=4),
+    Provider.LUMA: RateLimit(requests_per_minute=60, max_concurrency=8),
+    Provider.XAI: RateLimit(requests_per_minute=60, max_concurrency=8),
+    Provider.REPLICATE: RateLimit(requests_per_minute=600, max_concurrency=16),
+}
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second, holding at most ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def take(self) -> None:
+        # The lock keeps waiters in FIFO order instead of racing for each new token
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+class RateLimiter:
+    """Async context manager enforcing a requests-per-minute budget and an in-flight cap."""
+
+    def __init__(self, limit: RateLimit) -> None:
+        self.limit = limit
+        self._bucket: TokenBucket | None = None
+        if limit.requests_per_minute:
+            rate = limit.requests_per_minute / 60
+            self._bucket = TokenBucket(rate, limit.burst or max(1, limit.max_concurrency or 1))
+        self._slots = asyncio.Semaphore(limit.max_concurrency) if limit.max_concurrency else None
+
+    @property
+    def max_concurrency(self) -> int | None:
+        return self.limit.max_concurrency
+
+    async def __aenter__(self) -> "RateLimiter":
+        # Take a slot before a token so queued requests don't spend the budget while waiting
+        if self._slots is not None:
+            await self._slots.acquire()
+        if self._bucket is not None:
+            try:
+                await self._bucket.take()
+            except BaseException:
+                if self._slots is not None:
+                    self._slots.release()
+                raise
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        if self._slots is not None:
+            self._slots.release()
+
+
+# Limits overridden with set_rate_limit(), taking precedence over DEFAULT_RATE_LIMITS
+_limits: dict[Provider, RateLimit] = {}
+
+# Locks and semaphores belong to the loop that first uses them, so limiters are kept per loop
+_limiters: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[Provider, RateLimiter]] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_rate_limiter(provider: str | Provider) -> RateLimiter:
+    """Return the limiter for a provider, shared by every bulk job on the running event loop."""
+    provider_enum = provider if isinstance(provider, Provider) else Provider(provider)
+    limiters = _limiters.setdefault(asyncio.get_running_loop(), {})
+    limiter = limiters.get(provider_enum)
+    if limiter is None:
+        limit = _limits.get(provider_enum) or DEFAULT_RATE_LIMITS.get(provider_enum, RateLimit())
+        limiter = limiters[provider_enum] = RateLimiter(limit)
+    return limiter
+
+
+def set_rate_limit(provider: str | Provider, limit: RateLimit) -> None:
+    """Replace a provider's limits, e.g. to match a higher account tier."""
+    provider_enum = provider if isinstance(provider, Provider) else Provider(provider)
+    _limits[provider_enum] = limit
+    for limiters in list(_limiters.values()):
+        limiters.pop(provider_enum, None)
+
+
+__all__ = ["DEFAULT_RATE_LIMITS", "RateLimit", "RateLimiter", "TokenBucket", "get_rate_limiter", "set_rate_limit"]
@@ -0,0 +1,115 @@
+"""
+Opt-in registry that memoizes image generators so clients and weights are built once.
+"""
+
+import asyncio
+import inspect
+from collections import OrderedDict
+from collections.abc import Hashable
+from dataclasses import dataclass
+from typing import Any
+
+from celeste_core import Provider
+from celeste_core.base.image_generator import BaseImageGenerator
+
+from .factory import create_image_generator
+
+
+@dataclass
+class RegistryStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    size: int = 0
+
+
+def freeze_kwargs(value: Any) -> Hashable:
+    """Normalize kwargs into a hashable, order-independent key."""
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), freeze_kwargs(v)) for k, v in value.items()))
+    if isinstance(value, list | tuple | set | frozenset):
+        items = tuple(freeze_kwargs(v) for v in value)
+        return tuple(sorted(items, key=repr)) if isinstance(value, set | frozenset) else items
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    hashable: Hashable = value
+    return hashable
+
+
+async def close_generator(generator: BaseImageGenerator) -> None:
+    """Release the clients held by a generator, if it knows how to."""
+    aclose = getattr(generator, "aclose", None)
+    if aclose is None:
+        return
+    result = aclose()
+    if inspect.isawaitable(result):
+        await result
+
+
+class GeneratorRegistry:
+    """LRU cache of generators keyed on (provider, model, normalized kwargs).
+
+    Evicted generators are closed, so callers should not keep using an instance after
+    it could have been pushed out of the registry by ``maxsize`` newer entries.
+    """
+
+    def __init__(self, maxsize: int = 16) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self._generators: OrderedDict[Hashable, BaseImageGenerator] = OrderedDict()
+        self._stats = RegistryStats()
+        self._closing: set[asyncio.Task[None]] = set()
+
+    def get(self, provider: str | Provider, **kwargs: Any) -> BaseImageGenerator:
+        """Return a cached generator, creating it with create_image_generator on a miss."""
+        provider_enum = provider if isinstance(provider, Provider) else Provider(provider)
+        key = (provider_enum, kwargs.get("model"), freeze_kwargs(kwargs))
+
+        generator = self._generators.get(key)
+        if generator is not None:
+            self._generators.move_to_end(key)
+            self._stats.hits += 1
+            return generator
+
+        self._stats.misses += 1
+        generator = create_image_generator(provider_enum, **kwargs)
+        self._generators[key] = generator
+        while len(self._generators) > self.maxsize:
+            _, evicted = self._generators.popitem(last=False)
+            self._stats.evictions += 1
+            self._schedule_close(evicted)
+        return generator
+
+    @property
+    def stats(self) -> RegistryStats:
+        return RegistryStats(
+            hits=self._stats.hits,
+            misses=self._stats.misses,
+            evictions=self._stats.evictions,
+            size=len(self._generators),
+        )
+
+    def __len__(self) -> int:
+        return len(self._generators)
+
+    def _schedule_close(self, generator: BaseImageGenerator) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(close_generator(generator))
+            return
+        task = loop.create_task(close_generator(generator))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def aclose(self) -> None:
+        """Close every cached generator and empty the registry."""
+        generators = list(self._generators.values())
+        self._generators.clear()
+        await asyncio.gather(*(close_generator(g) for g in generators), *self._closing)
+
+
+__all__ = ["GeneratorRegistry", "RegistryStats", "close_generator", "freeze_kwargs"]
@@ -0,0 +1,304 @@
+"""
+Retries, backoff and circuit breaking driven by provider responses.
+"""
+
+import asyncio
+import random
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Any
+
+from celeste_core import ImageArtifact, Provider
+from celeste_core.base.image_generator import BaseImageGenerator
+
+from .instrumentation import increment
+from .lazy import lazy_import
+from .wrapper import ImageGeneratorWrapper
+
+if TYPE_CHECKING:
+    import aiohttp
+
+    from .sessions import SessionPool
+else:
+    aiohttp = lazy_import("aiohttp")
+
+# Statuses that signal overload or a transient backend failure rather than a bad request
+RETRYABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+# Statuses that say the provider turned a request away before doing any work
+UNACCEPTED_STATUS = frozenset({429})
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the provider while its circuit breaker is open."""
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 20.0
+    max_retry_after: float = 60.0
+    # Retries allowed per request on average, so retries can't multiply load during an outage
+    budget_ratio: float = 0.2
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+    # Also retry whole calls to generators not marked ``idempotent``. A call that failed after
+    # the provider accepted it (a slow 5xx, a failed poll or download) may already have been
+    # billed, and retrying it pays for a second generation
+    retry_non_idempotent: bool = False
+
+
+def error_status(exc: BaseException) -> int | None:
+    """HTTP status carried by an aiohttp or SDK exception, if any."""
+    for attr in ("status", "status_code", "code"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def retry_after(exc: BaseException) -> float | None:
+    """Seconds requested by a ``Retry-After`` header on the failed response, if any."""
+    headers = getattr(exc, "headers", None) or getattr(getattr(exc, "response", None), "headers", None)
+    value = headers.get("Retry-After") if headers else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(exc: BaseException, transport_errors: tuple[type[BaseException], ...] = ()) -> bool:
+    """Whether an error is transient: an overload/5xx status or a dropped connection."""
+    status = error_status(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return isinstance(exc, (aiohttp.ClientConnectionError, ConnectionError, *transport_errors))
+
+
+def was_rejected(exc: BaseException) -> bool:
+    """Whether the provider turned a request away unprocessed: throttled (429), a 503 naming a
+    ``Retry-After``, or no connection made. Repeating such a request can't bill twice.
+    """
+    status = error_status(exc)
+    if status is not None:
+        return status in UNACCEPTED_STATUS or (status == 503 and retry_after(exc) is not None)
+    return isinstance(exc, (aiohttp.ClientConnectorError, ConnectionRefusedError))
+
+
+def backoff_delay(policy: RetryPolicy, attempt: int, exc: BaseException) -> float:
+    """Seconds before retry ``attempt``: the ``Retry-After`` if any, else jittered exponential."""
+    requested = retry_after(exc)
+    if requested is not None:
+        return min(requested, policy.max_retry_after)
+    return random.uniform(0, min(policy.max_delay, policy.base_delay * 2**attempt))
+
+
+async def retry_step[T](
+    step: Callable[[], Awaitable[T]],
+    policy: RetryPolicy | None = None,
+    transport_errors: tuple[type[BaseException], ...] = (),
+    retryable: Callable[[BaseException], bool] | None = None,
+) -> T:
+    """Run one step of a call that is safe to repeat on its own, retrying transient errors.
+
+    For steps such as downloading a finished generation inside a call that as a whole must not
+    be repeated. ``retryable`` narrows the errors retried, e.g. to ``was_rejected`` for the
+    request that starts paid work. There is no retry budget or circuit breaker at this level.
+    """
+    policy = policy or RetryPolicy()
+    attempt = 0
+    while True:
+        try:
+            return await step()
+        except Exception as exc:
+            attempt += 1
+            transient = retryable(exc) if retryable is not None else is_retryable(exc, transport_errors)
+            if attempt >= policy.max_attempts or not transient:
+                raise
+            increment("retries")
+            await asyncio.sleep(backoff_delay(policy, attempt, exc))
+
+
+async def post_until_accepted(
+    session_pool: "SessionPool",
+    url: str,
+    *,
+    data: Callable[[], Any] | None = None,
+    policy: RetryPolicy | None = None,
+    **kwargs: Any,
+) -> "aiohttp.ClientResponse":
+    """POST the request that starts a paid generation, retrying only while it is turned away.
+
+    Returns the successful response for the caller to read and release (``async with``).
+    ``data`` builds the body for each attempt, since a FormData body can be sent only once.
+    """
+
+    async def post() -> "aiohttp.ClientResponse":
+        body = data() if data is not None else None
+        response = await session_pool.session().post(url, data=body, **kwargs)
+        response.raise_for_status()  # releases the connection before raising
+        return response
+
+    return await retry_step(post, policy, retryable=was_rejected)
+
+
+class RetryBudget:
+    """Each request earns ``ratio`` retry tokens and each retry spends one."""
+
+    def __init__(self, ratio: float, min_per_second: float = 1.0, capacity: float = 10.0) -> None:
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = capacity
+        self._balance = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, amount: float) -> None:
+        now = time.monotonic()
+        amount += (now - self._updated) * self.min_per_second
+        self._balance = min(self.capacity, self._balance + amount)
+        self._updated = now
+
+    def record_request(self) -> None:
+        self._refill(self.ratio)
+
+    def try_spend(self) -> bool:
+        self._refill(0.0)
+        if self._balance < 1:
+            return False
+        self._balance -= 1
+        return True
+
+
+class CircuitBreaker:
+    """Opens after consecutive transient failures and lets one trial call through per reset."""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def before_call(self) -> None:
+        state = self.state
+        if state == "open" or (state == "half-open" and self._trial_running):
+            raise CircuitOpenError("Circuit breaker open: backend is failing, not sending request")
+        self._trial_running = state == "half-open"
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    def release(self) -> None:
+        """End a call whose outcome says nothing about backend health."""
+        self._trial_running = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_running = False
+        if self.failures >= self.failure_threshold or self.opened_at is not None:
+            self.opened_at = time.monotonic()
+
+
+_breakers: dict[tuple[Provider, str | None], CircuitBreaker] = {}
+_budgets: dict[Provider, RetryBudget] = {}
+
+
+def get_circuit_breaker(provider: Provider, model: str | None, policy: RetryPolicy) -> CircuitBreaker:
+    """Process-wide breaker for a (provider, model) backend."""
+    key = (provider, model)
+    if key not in _breakers:
+        _breakers[key] = CircuitBreaker(policy.failure_threshold, policy.reset_timeout)
+    return _breakers[key]
+
+
+def get_retry_budget(provider: Provider, policy: RetryPolicy) -> RetryBudget:
+    if provider not in _budgets:
+        _budgets[provider] = RetryBudget(policy.budget_ratio)
+    return _budgets[provider]
+
+
+class ResilientImageGenerator(ImageGeneratorWrapper):
+    """Retries transient failures with jittered exponential backoff and fails fast when the
+    backend's circuit breaker is open.
+
+    Whole calls are retried only for generators with a true ``idempotent`` attribute (or with
+    ``policy.retry_non_idempotent``); the others get circuit breaking alone, and retry the
+    steps that are safe to repeat themselves: a request turned away unprocessed (see
+    ``post_until_accepted``), polls and downloads. Generators can declare SDK-specific
+    transport errors to retry in a ``transport_errors`` attribute.
+    """
+
+    def __init__(self, generator: BaseImageGenerator, policy: RetryPolicy | None = None) -> None:
+        super().__init__(generator)
+        self.policy = policy or RetryPolicy()
+        self.breaker = get_circuit_breaker(generator.provider, generator.model, self.policy)
+        self.budget = get_retry_budget(generator.provider, self.policy)
+        self.retries_calls = self.policy.retry_non_idempotent or bool(getattr(generator, "idempotent", False))
+
+    def backoff(self, attempt: int, exc: BaseException) -> float:
+        return backoff_delay(self.policy, attempt, exc)
+
+    async def generate_image(self, prompt: str, **kwargs: Any) -> list[ImageArtifact]:
+        self.budget.record_request()
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                artifacts: list[ImageArtifact] = await self.generator.generate_image(prompt, **kwargs)
+            except Exception as exc:
+                # Looked up per failure, since providers resolve their SDK's error types lazily
+                if not is_retryable(exc, getattr(self.generator, "transport_errors", ())):
+                    # A rejected request still proves the backend is answering
+                    if error_status(exc) is not None:
+                        self.breaker.record_success()
+                    else:
+                        self.breaker.release()
+                    raise
+                self.breaker.record_failure()
+                attempt += 1
+                if not self.retries_calls or attempt >= self.policy.max_attempts or not self.budget.try_spend():
+                    raise
+                increment("retries")
+                await asyncio.sleep(self.backoff(attempt, exc))
+                continue
+            except BaseException:  # cancelled: free a half-open trial slot for the next caller
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            return artifacts
+
+
+__all__ = [
+    "RETRYABLE_STATUS",
+    "UNACCEPTED_STATUS",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "ResilientImageGenerator",
+    "RetryBudget",
+    "RetryPolicy",
+    "backoff_delay",
+    "error_status",
+    "is_retryable",
+    "post_until_accepted",
+    "retry_after",
+    "retry_step",
+    "was_rejected",
+]
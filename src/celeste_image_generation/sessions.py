@@ -0,0 +1,104 @@
+"""
+Shared, pooled aiohttp sessions for the HTTP-based providers.
+"""
+
+import asyncio
+from types import TracebackType
+
+import aiohttp
+
+from .instrumentation import http_trace_config
+
+
+class SessionPool:
+    """Owns one keep-alive aiohttp session (and its connector) per event loop."""
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 20,
+        keepalive_timeout: float = 30.0,
+        ttl_dns_cache: int | None = 300,
+        timeout: aiohttp.ClientTimeout | None = None,
+    ) -> None:
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.ttl_dns_cache = ttl_dns_cache
+        self.timeout = timeout or aiohttp.ClientTimeout(total=None, sock_connect=30)
+        self._sessions: dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+        self._closing: set[asyncio.Task[None]] = set()
+
+    def session(self) -> aiohttp.ClientSession:
+        """Return the running loop's pooled session, creating it on first use in that loop."""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            self._close_finished(loop)
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                use_dns_cache=self.ttl_dns_cache is not None,
+                ttl_dns_cache=self.ttl_dns_cache,
+            )
+            session = self._sessions[loop] = aiohttp.ClientSession(
+                connector=connector, timeout=self.timeout, trace_configs=[http_trace_config()]
+            )
+        return session
+
+    def _close_finished(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Close the sessions of loops that have been closed, e.g. by an earlier asyncio.run."""
+        for finished in [other for other in self._sessions if other.is_closed()]:
+            # aiohttp releases the connector of a closed loop without needing that loop
+            task = loop.create_task(self._sessions.pop(finished).close())
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    @property
+    def closed(self) -> bool:
+        return all(session.closed for session in self._sessions.values())
+
+    async def aclose(self) -> None:
+        """Close the pooled sessions and release every kept-alive connection.
+
+        Sessions of loops running in other threads are closed on their own loop.
+        """
+        current = asyncio.get_running_loop()
+        for loop, session in list(self._sessions.items()):
+            if loop is current or loop.is_closed():
+                await session.close()
+            elif loop.is_running():
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(session.close(), loop))
+            else:
+                # Kept until that loop runs again (and closes it) or is closed
+                continue
+            self._sessions.pop(loop, None)
+        await asyncio.gather(*self._closing, return_exceptions=True)
+
+    async def __aenter__(self) -> "SessionPool":
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        await self.aclose()
+
+
+_default_pool = SessionPool()
+
+
+def get_session_pool() -> SessionPool:
+    """Return the package-wide pool shared by generators that were not given their own."""
+    return _default_pool
+
+
+async def close_sessions() -> None:
+    """Close the package-wide pool. It is recreated lazily on next use."""
+    await _default_pool.aclose()
+
+
+__all__ = ["SessionPool", "close_sessions", "get_session_pool"]
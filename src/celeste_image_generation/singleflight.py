@@ -0,0 +1,123 @@
+"""
+Single-flight coalescing of identical in-flight generation requests.
+"""
+
+import asyncio
+import copy
+import weakref
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+from celeste_core import ImageArtifact
+from celeste_core.base.image_generator import BaseImageGenerator
+
+from .cache import is_seeded
+from .params import request_key
+from .wrapper import ImageGeneratorWrapper
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Call:
+    task: asyncio.Future[Any]
+    waiters: int = 0
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time and shares its outcome with every waiter.
+
+    The shared call is cancelled only once every waiter has been cancelled; a waiter that
+    goes away on its own does not affect the others.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[str, _Call] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = self._start(key, fn)
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            result: T = await asyncio.shield(call.task)
+            return result
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Every waiter was cancelled: nobody wants the result any more
+                call.task.cancel()
+                self._forget(key, call)
+
+    def _start(self, key: str, fn: Callable[[], Awaitable[Any]]) -> _Call:
+        call = _Call(asyncio.ensure_future(fn()))
+        self._calls[key] = call
+        self.started += 1
+        call.task.add_done_callback(lambda _: self._forget(key, call))
+        return call
+
+    def _forget(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+
+# Futures belong to the loop that created them, so the shared table is per event loop
+_flights: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, SingleFlight] = weakref.WeakKeyDictionary()
+
+
+def get_single_flight() -> SingleFlight:
+    """Return the running loop's flight table, shared by generators not given their own."""
+    loop = asyncio.get_running_loop()
+    flight = _flights.get(loop)
+    if flight is None:
+        flight = _flights[loop] = SingleFlight()
+    return flight
+
+
+def _copy_artifact(artifact: ImageArtifact) -> ImageArtifact:
+    copied = copy.copy(artifact)
+    copied.metadata = dict(artifact.metadata or {})
+    return copied
+
+
+class SingleFlightImageGenerator(ImageGeneratorWrapper):
+    """Lets one upstream generate_image call serve every identical concurrent request.
+
+    Identical means same provider, model, prompt and kwargs, whichever generator instance the
+    requests arrive through: by default every wrapper shares the running loop's flight table.
+    Unseeded requests are coalesced too, so simultaneous identical unseeded requests receive
+    the same images; pass ``coalesce_unseeded=False`` to give each of them its own call.
+    """
+
+    def __init__(
+        self, generator: BaseImageGenerator, coalesce_unseeded: bool = True, flight: SingleFlight | None = None
+    ) -> None:
+        super().__init__(generator)
+        self.coalesce_unseeded = coalesce_unseeded
+        self._flight = flight
+
+    @property
+    def flight(self) -> SingleFlight:
+        return self._flight if self._flight is not None else get_single_flight()
+
+    async def generate_image(self, prompt: str, **kwargs: Any) -> list[ImageArtifact]:
+        if not (self.coalesce_unseeded or is_seeded(kwargs)):
+            uncoalesced: list[ImageArtifact] = await self.generator.generate_image(prompt, **kwargs)
+            return uncoalesced
+
+        key = request_key(self.provider, self.model, prompt, kwargs)
+        artifacts = await self.flight.do(key, lambda: self.generator.generate_image(prompt, **kwargs))
+        # Each waiter gets its own list and artifacts, so one caller's edits don't reach the others
+        return [_copy_artifact(artifact) for artifact in artifacts]
+
+
+__all__ = ["SingleFlight", "SingleFlightImageGenerator", "get_single_flight"]
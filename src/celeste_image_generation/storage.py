@@ -0,0 +1,215 @@
+"""
+Spill-to-disk storage for image payloads, so large batches don't hold every image in memory.
+"""
+
+import asyncio
+import base64
+import contextlib
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+import weakref
+from collections.abc import AsyncIterable, AsyncIterator
+from pathlib import Path
+from typing import Any
+
+# Base64 characters decoded per step; a multiple of 4 so every piece decodes on its own
+_B64_STEP = 1024 * 1024
+
+# Streamed bytes handed to the writer thread at once; a thread hop per chunk would cost more
+_WRITE_BATCH = 1024 * 1024
+
+
+class SpilledPayload:
+    """Image bytes held in a file and memory-mapped on first access.
+
+    ``buffer`` is a read-only memoryview over the mapping, which the OS pages in and out as
+    needed; ``read()`` copies the bytes into memory.
+    """
+
+    def __init__(self, path: Path, size: int) -> None:
+        self.path = path
+        self.size = size
+        self._mmap: mmap.mmap | None = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __repr__(self) -> str:
+        return f"SpilledPayload({str(self.path)!r}, size={self.size})"
+
+    @property
+    def buffer(self) -> memoryview:
+        with self._lock:
+            if self._mmap is None:
+                with self.path.open("rb") as f:
+                    self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return memoryview(self._mmap)
+
+    def read(self) -> bytes:
+        return self.path.read_bytes()
+
+    def close(self) -> None:
+        """Unmap the file. Views returned by ``buffer`` must have been released."""
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+
+    def delete(self) -> None:
+        self.close()
+        self.path.unlink(missing_ok=True)
+
+
+class ArtifactStore:
+    """Keeps payloads up to ``memory_threshold`` bytes in memory and spills larger ones to disk.
+
+    Streamed payloads are buffered only until they cross the threshold, and base64 payloads
+    are decoded into the file piece by piece, so a request holds at most about the threshold
+    (plus its raw response) in memory whatever the image size or batch length.
+
+    Spilled artifacts have ``data=None``, the SpilledPayload in ``metadata["payload"]`` and
+    its file in ``metadata["path"]``. Without a ``directory``, files go to a temporary
+    directory removed by ``cleanup()`` or at interpreter exit.
+    """
+
+    def __init__(self, directory: str | os.PathLike[str] | None = None, memory_threshold: int = 1024 * 1024) -> None:
+        self.memory_threshold = memory_threshold
+        if directory is None:
+            self.directory = Path(tempfile.mkdtemp(prefix="celeste-artifacts-"))
+            self._finalizer: weakref.finalize | None = weakref.finalize(
+                self, shutil.rmtree, self.directory, ignore_errors=True
+            )
+        else:
+            self.directory = Path(directory)
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._finalizer = None
+
+    def cleanup(self) -> None:
+        """Remove a temporary directory created by this store, with every payload in it."""
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def _new_path(self) -> Path:
+        return self.directory / f"{uuid.uuid4().hex}.bin"
+
+    def _spilled(self, path: Path, size: int) -> tuple[None, dict[str, Any]]:
+        return None, {"payload": SpilledPayload(path, size), "path": str(path)}
+
+    def put(self, data: bytes) -> tuple[bytes | None, dict[str, Any]]:
+        """Store complete bytes: returned as-is below the threshold, else written out."""
+        if len(data) <= self.memory_threshold:
+            return data, {}
+        payload = self.write(data)
+        return self._spilled(payload.path, payload.size)
+
+    def write(self, data: bytes) -> SpilledPayload:
+        """Write bytes to a new file in the store, whatever their size."""
+        path = self._new_path()
+        path.write_bytes(data)
+        return SpilledPayload(path, len(data))
+
+    def adopt(self, payload: SpilledPayload) -> SpilledPayload:
+        """Move a payload spilled elsewhere (e.g. by another store) into this store."""
+        if payload.path.parent == self.directory:
+            return payload
+        payload.close()
+        path = self.directory / payload.path.name
+        shutil.move(payload.path, path)
+        return SpilledPayload(path, payload.size)
+
+    async def save(self, source: bytes | AsyncIterable[bytes]) -> tuple[bytes | None, dict[str, Any]]:
+        """Store a complete or streamed payload, spilling once it grows past the threshold.
+
+        Disk writes run in worker threads, so the event loop never waits on the filesystem. A
+        stream that fails midway is closed (releasing e.g. its HTTP connection) and its partial
+        file removed.
+        """
+        if isinstance(source, bytes):
+            if len(source) <= self.memory_threshold:
+                return source, {}
+            payload = await asyncio.to_thread(self.write, source)
+            return self._spilled(payload.path, payload.size)
+
+        iterator = aiter(source)
+        try:
+            return await self._save_stream(iterator)
+        except BaseException:
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                with contextlib.suppress(Exception):
+                    await aclose()
+            raise
+
+    async def _save_stream(self, iterator: AsyncIterator[bytes]) -> tuple[bytes | None, dict[str, Any]]:
+        pending: list[bytes] = []
+        size = 0
+        async for chunk in iterator:
+            pending.append(chunk)
+            size += len(chunk)
+            if size > self.memory_threshold:
+                break
+        else:
+            return b"".join(pending), {}
+
+        path = self._new_path()
+        f = await asyncio.to_thread(path.open, "wb")
+        try:
+            buffered = size
+            async for chunk in iterator:
+                pending.append(chunk)
+                size += len(chunk)
+                buffered += len(chunk)
+                if buffered >= _WRITE_BATCH:
+                    batch, pending, buffered = pending, [], 0
+                    await asyncio.to_thread(f.writelines, batch)
+            await asyncio.to_thread(f.writelines, pending)
+        except BaseException:
+            f.close()
+            path.unlink(missing_ok=True)
+            raise
+        await asyncio.to_thread(f.close)
+        return self._spilled(path, size)
+
+    def put_b64(self, encoded: str | bytes) -> tuple[bytes | None, dict[str, Any]]:
+        """Decode a base64 payload, straight into a file if it decodes past the threshold."""
+        if len(encoded) * 3 // 4 <= self.memory_threshold:
+            return base64.b64decode(encoded), {}
+        path = self._new_path()
+        size = 0
+        try:
+            with path.open("wb") as f:
+                for start in range(0, len(encoded), _B64_STEP):
+                    piece = base64.b64decode(encoded[start : start + _B64_STEP])
+                    f.write(piece)
+                    size += len(piece)
+        except BaseException:
+            path.unlink(missing_ok=True)
+            raise
+        return self._spilled(path, size)
+
+    async def save_b64(self, encoded: str | bytes) -> tuple[bytes | None, dict[str, Any]]:
+        """``put_b64`` with the decoding into a file run in a worker thread."""
+        if len(encoded) * 3 // 4 <= self.memory_threshold:
+            return base64.b64decode(encoded), {}
+        return await asyncio.to_thread(self.put_b64, encoded)
+
+
+async def decode_b64(encoded: str | bytes, store: ArtifactStore | None) -> tuple[bytes | None, dict[str, Any]]:
+    """Decode a base64 image through ``store`` if there is one, else fully in memory."""
+    if store is None:
+        return base64.b64decode(encoded), {}
+    return await store.save_b64(encoded)
+
+
+def spilled_payload(metadata: dict[str, Any] | None) -> SpilledPayload | None:
+    """The SpilledPayload an artifact's bytes were moved to, if any."""
+    payload = (metadata or {}).get("payload")
+    return payload if isinstance(payload, SpilledPayload) else None
+
+
+__all__ = ["ArtifactStore", "SpilledPayload", "decode_b64", "spilled_payload"]
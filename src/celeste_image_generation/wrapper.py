@@ -0,0 +1,26 @@
+from typing import Any
+
+from celeste_core import ImageArtifact
+from celeste_core.base.image_generator import BaseImageGenerator
+
+
+class ImageGeneratorWrapper(BaseImageGenerator):
+    """Base for generators that add behaviour around another generator."""
+
+    def __init__(self, generator: BaseImageGenerator) -> None:
+        super().__init__(model=generator.model, provider=generator.provider)
+        self.generator = generator
+
+    def __getattr__(self, name: str) -> Any:
+        # Expose provider-specific helpers (aclose, preload, ...) of the wrapped generator
+        generator = self.__dict__.get("generator")
+        if generator is None:
+            raise AttributeError(name)
+        return getattr(generator, name)
+
+    async def generate_image(self, prompt: str, **kwargs: Any) -> list[ImageArtifact]:
+        artifacts: list[ImageArtifact] = await self.generator.generate_image(prompt, **kwargs)
+        return artifacts
+
+
+__all__ = ["ImageGeneratorWrapper"]
@@ -0,0 +1,25 @@
+"""create_image_generator wiring and credential checks."""
+
+import pytest
+from celeste_core.config.settings import settings
+
+from celeste_image_generation import create_image_generator
+
+
+@pytest.fixture
+def checked_providers(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    checked: list[str] = []
+    monkeypatch.setattr(settings, "validate_for_provider", checked.append)
+    return checked
+
+
+def test_explicit_api_key_skips_the_settings_check(checked_providers: list[str]) -> None:
+    generator = create_image_generator("google", api_key="explicit")
+    assert generator.api_key == "explicit"
+    assert checked_providers == []
+
+
+def test_api_key_ignored_by_the_generator_does_not_skip_the_check(checked_providers: list[str]) -> None:
+    # The Replicate generator authenticates with its settings token only
+    create_image_generator("replicate", api_key="ignored")
+    assert checked_providers == ["replicate"]
@@ -0,0 +1,41 @@
+"""Hedged requests and the latencies they learn from."""
+
+import asyncio
+from typing import Any
+
+from celeste_core import ImageArtifact, Provider
+from celeste_core.base.image_generator import BaseImageGenerator
+
+from celeste_image_generation.hedging import HedgedImageGenerator
+
+
+class _SleepingGenerator(BaseImageGenerator):
+    """Answers after the next of ``latencies`` (cycled) seconds."""
+
+    def __init__(self, latencies: list[float]) -> None:
+        super().__init__(model="test", provider=Provider.LOCAL)
+        self.latencies = latencies
+        self.calls = 0
+
+    async def generate_image(self, prompt: str, **_kwargs: Any) -> list[ImageArtifact]:
+        latency = self.latencies[self.calls % len(self.latencies)]
+        self.calls += 1
+        await asyncio.sleep(latency)
+        return [ImageArtifact(data=prompt.encode(), metadata={})]
+
+
+def test_hedge_delay_does_not_shrink_below_the_slow_tail() -> None:
+    # One call in five is slow and always loses to the hedge, so only its cancellation is seen
+    primary = _SleepingGenerator([0.01, 0.01, 0.01, 0.01, 0.5])
+    backup = _SleepingGenerator([0.1])
+    hedged = HedgedImageGenerator([primary, backup], hedge_percentile=0.9, default_hedge_delay=0.1, min_samples=5)
+
+    async def scenario() -> None:
+        for i in range(20):
+            await hedged.generate_image(f"request {i}")
+        await asyncio.sleep(0)  # let the last cancelled call record itself
+
+    asyncio.run(scenario())
+    assert hedged.histograms[0].total == 20
+    # Cancelled slow calls ran for at least the hedge delay plus the backup's latency
+    assert hedged.hedge_delay(0) >= 0.1
@@ -0,0 +1,108 @@
+"""JobQueue leases and Worker resumption, on a real SQLite file."""
+
+import asyncio
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+from celeste_core import ImageArtifact
+
+from celeste_image_generation.jobs import JobQueue, JobState, Worker
+
+
+@pytest.fixture
+def queue(tmp_path: Path) -> JobQueue:
+    return JobQueue(tmp_path / "jobs.db", lease=0.2)
+
+
+def test_expired_lease_is_reclaimed_by_another_worker(queue: JobQueue) -> None:
+    job_id = asyncio.run(queue.submit("luma", "a lighthouse"))
+
+    first = queue.claim("worker-1")
+    assert first is not None
+    assert (first.id, first.state, first.attempts) == (job_id, JobState.RUNNING, 1)
+    assert queue.claim("worker-2") is None  # leased
+    assert queue.renew(job_id, "worker-1")
+
+    time.sleep(0.25)
+    second = queue.claim("worker-2")
+    assert second is not None
+    assert (second.id, second.attempts) == (job_id, 2)
+    # The first worker has lost the job: its writes no longer land
+    assert not queue.renew(job_id, "worker-1")
+    assert not queue.complete(job_id, "worker-1", [])
+    assert queue.complete(job_id, "worker-2", [])
+    assert queue.get_job(job_id).state is JobState.SUCCEEDED
+
+
+def test_job_that_keeps_losing_its_worker_fails(queue: JobQueue) -> None:
+    job_id = asyncio.run(queue.submit("luma", "a lighthouse", max_attempts=2))
+    for worker in ("worker-1", "worker-2"):
+        assert queue.claim(worker) is not None
+        time.sleep(0.25)
+    assert queue.claim("worker-3") is None
+    job = queue.get_job(job_id)
+    assert job.state is JobState.FAILED
+    assert job.error == "Worker lost after 2 attempts"
+
+
+class _AsyncJobGenerator:
+    """Stands in for a provider with submit/wait, such as Luma."""
+
+    model = "photon-1"
+
+    def __init__(self) -> None:
+        self.submitted: list[str] = []
+        self.waited: list[tuple[str, bool]] = []
+
+    async def submit(self, prompt: str, **_kwargs: Any) -> str:
+        self.submitted.append(prompt)
+        return f"generation-{len(self.submitted)}"
+
+    async def wait(self, generation_id: str, *, resume: bool = True) -> list[ImageArtifact]:
+        self.waited.append((generation_id, resume))
+        return [ImageArtifact(data=generation_id.encode(), metadata={"generation_id": generation_id})]
+
+
+def run_worker(queue: JobQueue, results_dir: Path, generator: _AsyncJobGenerator, job_ids: list[str]) -> None:
+    async def scenario() -> None:
+        worker = Worker(queue, results_dir, poll_interval=0.01)
+        worker.registry.get = lambda *_args, **_options: generator  # type: ignore[method-assign]
+        stop = False
+        running = asyncio.create_task(worker.run(lambda: stop))
+        for job_id in job_ids:
+            await queue.wait(job_id, poll_interval=0.01, timeout=5)
+        stop = True
+        await running
+
+    asyncio.run(scenario())
+
+
+def test_worker_resumes_a_checkpointed_job_without_resubmitting(queue: JobQueue, tmp_path: Path) -> None:
+    job_id = asyncio.run(queue.submit("luma", "a lighthouse"))
+    # A worker submitted the generation, checkpointed it and died
+    assert queue.claim("lost-worker") is not None
+    assert queue.save_checkpoint(job_id, "lost-worker", "generation-7")
+    time.sleep(0.25)
+
+    generator = _AsyncJobGenerator()
+    run_worker(queue, tmp_path / "results", generator, [job_id])
+
+    assert generator.submitted == []
+    assert generator.waited == [("generation-7", True)]
+    job = queue.get_job(job_id)
+    assert (job.state, job.attempts, job.checkpoint) == (JobState.SUCCEEDED, 2, "generation-7")
+    artifacts = asyncio.run(queue.result(job_id))
+    assert artifacts[0].metadata["payload"].read() == b"generation-7"
+
+
+def test_worker_checkpoints_a_new_submission(queue: JobQueue, tmp_path: Path) -> None:
+    job_id = asyncio.run(queue.submit("luma", "a lighthouse"))
+
+    generator = _AsyncJobGenerator()
+    run_worker(queue, tmp_path / "results", generator, [job_id])
+
+    assert generator.submitted == ["a lighthouse"]
+    assert generator.waited == [("generation-1", False)]
+    assert queue.get_job(job_id).checkpoint == "generation-1"
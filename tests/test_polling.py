@@ -0,0 +1,94 @@
+"""GenerationPoller scheduling and job bookkeeping."""
+
+import asyncio
+from typing import Any
+
+from celeste_core import ImageArtifact, Provider
+from celeste_core.base.image_generator import BaseImageGenerator
+
+from celeste_image_generation.instrumentation import (
+    InstrumentedImageGenerator,
+    enable_instrumentation,
+    record_stage,
+    stage,
+)
+from celeste_image_generation.polling import GenerationPoller, JobStatus
+
+
+def test_job_retracked_during_a_stale_check_still_resolves() -> None:
+    async def scenario() -> tuple[dict[str, Any], int]:
+        release = asyncio.Event()
+        fetches = 0
+
+        async def fetch_status(_job_id: str) -> JobStatus:
+            nonlocal fetches
+            fetches += 1
+            if fetches == 1:
+                await release.wait()
+            return JobStatus(done=True, data={"fetch": fetches})
+
+        poller = GenerationPoller(fetch_status, expected_duration=0.05, min_interval=0.01)
+        abandoned = poller.track("job", resume=True)
+        while fetches == 0:
+            await asyncio.sleep(0.01)
+        abandoned.cancel()  # while its status check is in flight
+        retracked = poller.track("job")
+        release.set()
+        return await asyncio.wait_for(retracked, timeout=2), poller.pending
+
+    data, pending = asyncio.run(scenario())
+    # The stale check's result is dropped; the new entry is resolved by its own check
+    assert data == {"fetch": 2}
+    assert pending == 0
+
+
+def test_waiters_of_one_job_share_a_status_check() -> None:
+    async def scenario() -> tuple[list[dict[str, Any]], int]:
+        fetches = 0
+
+        async def fetch_status(_job_id: str) -> JobStatus:
+            nonlocal fetches
+            fetches += 1
+            return JobStatus(done=True, data={"id": "job"})
+
+        poller = GenerationPoller(fetch_status, expected_duration=0.01, min_interval=0.01)
+        results = await asyncio.gather(poller.track("job"), poller.track("job"))
+        return list(results), fetches
+
+    results, fetches = asyncio.run(scenario())
+    assert results == [{"id": "job"}, {"id": "job"}]
+    assert fetches == 1
+
+
+class _PollingGenerator(BaseImageGenerator):
+    """Waits on a shared poller whose status checks report an HTTP stage."""
+
+    def __init__(self, poller: GenerationPoller) -> None:
+        super().__init__(model="photon-1", provider=Provider.LUMA)
+        self.poller = poller
+
+    async def generate_image(self, prompt: str, **_kwargs: Any) -> list[ImageArtifact]:
+        with stage("polling"):
+            await self.poller.track(prompt)
+        return [ImageArtifact(data=b"image", metadata={})]
+
+
+def test_shared_status_checks_stay_out_of_request_traces() -> None:
+    async def fetch_status(_job_id: str) -> JobStatus:
+        record_stage("http_request", 1.0)
+        return JobStatus(done=True)
+
+    async def scenario() -> list[list[ImageArtifact]]:
+        poller = GenerationPoller(fetch_status, expected_duration=0.01, min_interval=0.01)
+        generator = InstrumentedImageGenerator(_PollingGenerator(poller))
+        return await asyncio.gather(*(generator.generate_image(f"job-{i}") for i in range(3)))
+
+    enable_instrumentation()
+    try:
+        results = asyncio.run(scenario())
+    finally:
+        enable_instrumentation(False)
+    for artifacts in results:
+        stages = artifacts[0].metadata["timings"]["stages"]
+        assert "http_request" not in stages
+        assert stages["polling"] > 0
@@ -0,0 +1,54 @@
+"""Retries through the default create_image_generator stack, against a local HTTP server."""
+
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from celeste_image_generation import create_image_generator
+from celeste_image_generation.sessions import close_sessions
+
+
+async def generate_against(responses: list[web.Response]) -> tuple[int, BaseException | None]:
+    """Call Stability through the default stack while the server answers with ``responses``."""
+    calls = 0
+
+    async def handle(_request: web.Request) -> web.Response:
+        nonlocal calls
+        calls += 1
+        return responses.pop(0)
+
+    app = web.Application()
+    app.router.add_post("/v2beta/stable-image/generate/{model}", handle)
+    async with TestServer(app) as server:
+        generator = create_image_generator("stabilityai", base_url=str(server.make_url("/v2beta")), api_key="test")
+        try:
+            artifacts = await generator.generate_image("a lighthouse")
+        except aiohttp.ClientResponseError as exc:
+            return calls, exc
+        finally:
+            await close_sessions()
+    assert artifacts[0].data == b"image"
+    return calls, None
+
+
+@pytest.mark.parametrize(
+    ("status", "headers"),
+    [(429, {"Retry-After": "0"}), (429, {}), (503, {"Retry-After": "0"})],
+)
+def test_rejected_call_is_retried_by_default(status: int, headers: dict[str, str]) -> None:
+    responses = [web.Response(status=status, headers=headers), web.Response(body=b"image")]
+    calls, error = asyncio.run(generate_against(responses))
+    assert error is None
+    assert calls == 2
+
+
+def test_failure_after_acceptance_is_not_retried() -> None:
+    # The provider may have done (and billed) the work, so a paid call isn't repeated
+    responses = [web.Response(status=500), web.Response(body=b"image")]
+    calls, error = asyncio.run(generate_against(responses))
+    assert isinstance(error, aiohttp.ClientResponseError)
+    assert error.status == 500
+    assert calls == 1